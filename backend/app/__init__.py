@@ -1,9 +1,107 @@
-from flask import Flask
+import sys
+from inspect import iscoroutinefunction
+from functools import wraps
+from flask import Flask, Response
+from flask.globals import request_ctx
+from flask.signals import request_started
 from flask_cors import CORS
+from werkzeug.exceptions import HTTPException
+from app.utils.eventLoop import run_async
+
+
+def _iterate_async_body(body):
+    """Drives an async response body from a synchronous server, one chunk per hop to the worker loop."""
+    iterator = body.__aiter__()
+    try:
+        while True:
+            try:
+                yield run_async(iterator.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            run_async(aclose())
+
+
+class NewsletterApp(Flask):
+    """
+    Flask app with two ways of running async views.
+
+    Under the ASGI entry point (asgi.py) a request for an async view is dispatched
+    natively with dispatch_async(): the handler is awaited on the server's event loop
+    and holds no thread. Sync views, and every view under a WSGI server (run.py, the
+    test client), go through ensure_sync, which runs coroutines on the worker's shared
+    event loop (see utils/eventLoop.py).
+    """
+
+    def ensure_sync(self, func):
+        if not iscoroutinefunction(func):
+            return func
+
+        @wraps(func)
+        def run(*args, **kwargs):
+            rv = run_async(func(*args, **kwargs))
+            # A WSGI server cannot iterate an async body (e.g. a server-sent event stream)
+            if isinstance(rv, Response) and hasattr(rv.response, "__aiter__"):
+                rv.response = _iterate_async_body(rv.response)
+            return rv
+        return run
+
+    def is_async_view(self, environ):
+        """Whether the request in environ is routed to an async view function."""
+        try:
+            endpoint, _ = self.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return False
+        return iscoroutinefunction(self.view_functions.get(endpoint))
+
+    async def dispatch_async(self, environ, send_response):
+        """
+        Handles one request for an async view on the running event loop.
+
+        Mirrors wsgi_app/full_dispatch_request, except that the view is awaited. The
+        finished response is handed to send_response (a coroutine function) while the
+        request context is still pushed, so streamed bodies can use it.
+        """
+        ctx = self.request_context(environ)
+        error = None
+        try:
+            try:
+                ctx.push()
+                response = self.finalize_request(await self._dispatch_view_async())
+            except Exception as e:
+                error = e
+                response = self.handle_exception(e)
+            except:  # noqa: E722
+                error = sys.exc_info()[1]
+                raise
+            await send_response(response)
+        finally:
+            if error is not None and self.should_ignore_error(error):
+                error = None
+            ctx.pop(error)
+
+    async def _dispatch_view_async(self):
+        self._got_first_request = True
+        try:
+            request_started.send(self, _async_wrapper=self.ensure_sync)
+            rv = self.preprocess_request()
+            if rv is None:
+                req = request_ctx.request
+                if req.routing_exception is not None:
+                    self.raise_routing_exception(req)
+                rule = req.url_rule
+                if getattr(rule, "provide_automatic_options", False) and req.method == "OPTIONS":
+                    return self.make_default_options_response()
+                rv = await self.view_functions[rule.endpoint](**req.view_args)
+        except Exception as e:
+            rv = self.handle_user_exception(e)
+        return rv
 
 
 def create_app():
-    app = Flask(__name__,
+    app = NewsletterApp(__name__,
                 static_folder="/home/joel/Documents/Newsletter-Generator/frontend/newsletter-frontend/dist/assets", 
                 template_folder="/home/joel/Documents/Newsletter-Generator/frontend/newsletter-frontend/dist")
 
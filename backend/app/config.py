@@ -4,6 +4,7 @@ load_dotenv(override=True)
 OPENROUTER_API_KEY=os.getenv("OPENROUTER_API_KEY")
 CONVERT_API_SECRET=os.getenv("CONVERT_API_SECRET")
 IMAGEROUTER_API_KEY=os.getenv("IMAGEROUTER_API_KEY")
+BASE_DIR=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 OUTPUT_PATH="/home/joel/Documents/Newsletter-Generator/backend/app/utils/generatedHTMLs"
 INPUT_PATH="/home/joel/Documents/Newsletter-Generator/backend/pdfs"
 SUPABASE_URL=os.getenv("SUPABASE_URL")
@@ -11,4 +12,92 @@ SUPABASE_KEY=os.getenv("SUPABASE_KEY")
 SECRET_KEY=os.getenv("SECRET_KEY")
 JWT_SECRET_KEY=os.getenv("JWT_SECRET_KEY")
 GOOGLE_STUDIO_API_KEY=os.getenv("GOOGLE_STUDIO_API_KEY")
-SUPABASE_SERVICE_ROLE_KEY=os.getenv("SUPABASE_SERVICE_ROLE_KEY")
\ No newline at end of file
+SUPABASE_SERVICE_ROLE_KEY=os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+
+# Thumbnail rendering (Playwright browser pool)
+THUMBNAIL_POOL_SIZE=int(os.getenv("THUMBNAIL_POOL_SIZE", "2"))
+THUMBNAIL_RECYCLE_AFTER=int(os.getenv("THUMBNAIL_RECYCLE_AFTER", "100"))
+THUMBNAIL_RENDER_TIMEOUT=float(os.getenv("THUMBNAIL_RENDER_TIMEOUT", "30"))
+THUMBNAIL_MODE=os.getenv("THUMBNAIL_MODE", "inline").lower()  # "inline" or "deferred" (rendered after the save returns)
+THUMBNAIL_WORKERS=int(os.getenv("THUMBNAIL_WORKERS", "2"))
+THUMBNAIL_PENDING_TIMEOUT=int(os.getenv("THUMBNAIL_PENDING_TIMEOUT", "300"))
+
+# Background generation jobs
+JOBS_PATH=os.getenv("JOBS_PATH", os.path.join(BASE_DIR, "jobs"))
+JOB_DB_PATH=os.getenv("JOB_DB_PATH", os.path.join(JOBS_PATH, "jobs.sqlite3"))
+JOB_WORKERS=int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_PENDING=int(os.getenv("JOB_MAX_PENDING", "32"))
+
+# Per-generation workspaces
+WORKSPACES_PATH=os.getenv("WORKSPACES_PATH", os.path.join(BASE_DIR, "workspaces"))
+WORKSPACE_TTL_SECONDS=int(os.getenv("WORKSPACE_TTL_SECONDS", str(24 * 60 * 60)))
+
+# ConvertAPI PDF->HTML cache
+CONVERT_CACHE_PATH=os.getenv("CONVERT_CACHE_PATH", os.path.join(BASE_DIR, "cache", "conversions"))
+CONVERT_CACHE_MAX_BYTES=int(os.getenv("CONVERT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Outbound HTTP (shared keep-alive pools)
+HTTP_POOL_CONNECTIONS=int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+HTTP_POOL_MAXSIZE=int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+HTTP_CONNECT_TIMEOUT=float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT=float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_LONG_READ_TIMEOUT=float(os.getenv("HTTP_LONG_READ_TIMEOUT", "300"))
+HTTP_RETRIES=int(os.getenv("HTTP_RETRIES", "3"))
+HTTP_RETRY_BACKOFF=float(os.getenv("HTTP_RETRY_BACKOFF", "0.5"))
+
+# LLM clients (Gemini / OpenRouter)
+LLM_MAX_CONNECTIONS=int(os.getenv("LLM_MAX_CONNECTIONS", "50"))
+LLM_MAX_KEEPALIVE=int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+LLM_CONNECT_TIMEOUT=float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_TIMEOUT=float(os.getenv("LLM_TIMEOUT", "120"))
+
+# Template-less generation
+TEMPLATE_MAX_ATTEMPTS=max(1, int(os.getenv("TEMPLATE_MAX_ATTEMPTS", "3")))
+
+# transformText result cache
+TRANSFORM_CACHE_MAX_ENTRIES=int(os.getenv("TRANSFORM_CACHE_MAX_ENTRIES", "2048"))
+TRANSFORM_CACHE_TTL=int(os.getenv("TRANSFORM_CACHE_TTL", str(24 * 60 * 60)))
+TRANSFORM_CACHE_DB=os.getenv("TRANSFORM_CACHE_DB")  # optional SQLite file shared by all workers
+TRANSFORM_CACHE_NEAR_DUPLICATES=os.getenv("TRANSFORM_CACHE_NEAR_DUPLICATES", "false").lower() in ("1", "true", "yes")
+TRANSFORM_BATCH_MAX_CHARS=int(os.getenv("TRANSFORM_BATCH_MAX_CHARS", "6000"))
+TRANSFORM_BATCH_CONCURRENCY=int(os.getenv("TRANSFORM_BATCH_CONCURRENCY", "4"))
+
+# Session verification (require_active_session)
+JWT_CACHE_TTL=float(os.getenv("JWT_CACHE_TTL", "60"))
+JWT_CACHE_MAX_ENTRIES=int(os.getenv("JWT_CACHE_MAX_ENTRIES", "10000"))
+JWT_LEEWAY=float(os.getenv("JWT_LEEWAY", "5"))
+
+# Generated image cache
+IMAGE_CACHE_PATH=os.getenv("IMAGE_CACHE_PATH", os.path.join(BASE_DIR, "cache", "images"))
+IMAGE_CACHE_MAX_BYTES=int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+IMAGE_FILL_CONCURRENCY=int(os.getenv("IMAGE_FILL_CONCURRENCY", "6"))
+# Comma-separated imagerouter models clients may request, in addition to the default model
+IMAGE_ALLOWED_MODELS=[model.strip() for model in os.getenv("IMAGE_ALLOWED_MODELS", "").split(",") if model.strip()]
+
+# PDF template content generation
+CONTENT_CHUNK_SIZE=int(os.getenv("CONTENT_CHUNK_SIZE", "40"))
+CONTENT_CHUNK_CONCURRENCY=int(os.getenv("CONTENT_CHUNK_CONCURRENCY", "6"))
+CONTENT_CHUNK_RETRIES=int(os.getenv("CONTENT_CHUNK_RETRIES", "2"))
+
+# Project JSON read-through cache (get_newsletter_using_id / preview)
+PROJECT_JSON_CACHE_PATH=os.getenv("PROJECT_JSON_CACHE_PATH", os.path.join(BASE_DIR, "cache", "projects"))
+PROJECT_JSON_CACHE_MAX_BYTES=int(os.getenv("PROJECT_JSON_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+PROJECT_JSON_MEMORY_MAX_BYTES=int(os.getenv("PROJECT_JSON_MEMORY_MAX_BYTES", str(64 * 1024 * 1024)))
+PROJECT_JSON_REVALIDATE_AFTER=int(os.getenv("PROJECT_JSON_REVALIDATE_AFTER", str(60 * 60)))
+
+# Project version storage: "full" writes every version whole, "delta" writes JSON patches
+# against the previous version with a full keyframe every PROJECT_KEYFRAME_INTERVAL versions
+PROJECT_STORAGE_MODE=os.getenv("PROJECT_STORAGE_MODE", "full").lower()
+PROJECT_KEYFRAME_INTERVAL=int(os.getenv("PROJECT_KEYFRAME_INTERVAL", "10"))
+PROJECT_MATERIALIZED_MAX_BYTES=int(os.getenv("PROJECT_MATERIALIZED_MAX_BYTES", str(128 * 1024 * 1024)))
+
+# Project JSON compression in the templates bucket: "gzip", "zstd" (needs zstandard) or "none"
+PROJECT_COMPRESSION=os.getenv("PROJECT_COMPRESSION", "gzip").lower()
+PROJECT_COMPRESSION_LEVEL=int(os.getenv("PROJECT_COMPRESSION_LEVEL", "0"))  # 0 = codec default
+
+# Version diff results (/api/newsletters/<project_id>/diff)
+VERSION_DIFF_CACHE_MAX_BYTES=int(os.getenv("VERSION_DIFF_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# ASGI entry point (asgi.py): threads running Flask views per worker process. The LLM,
+# Supabase and HTTP calls awaited by async views run on the server's event loop instead.
+ASGI_WSGI_THREADS=int(os.getenv("ASGI_WSGI_THREADS", "32"))
@@ -3,22 +3,48 @@ from flask import (
     request,
     send_from_directory,
     jsonify,
-    current_app 
+    current_app,
+    Response
 )
 import asyncio
+import base64
+import hashlib
 import os
 import traceback
-import requests
 from werkzeug.utils import secure_filename
-from app.utils.convertApi import convert_pdf_to_html, convert_html_to_pdf
-from app.utils.templateGeneration import no_template_generation
-from app.utils.transformText import transformText
-from app.utils.imageGeneration import generate_image
+from werkzeug.datastructures import FileStorage
+from concurrent.futures import ThreadPoolExecutor
+from app.utils.convertApi import convert_pdf_to_html, convert_html_to_pdf, conversion_cache
+from app.utils.templateGeneration import no_template_generation_async, stream_no_template_generation, get_generation_stats
+from app.utils.transformText import transformTextAsync, transformTextBatchAsync, transform_cache
+from app.utils.imageFill import fill_placeholder_images
+from app.utils.imageGeneration import generate_image_async, get_cached_image, image_cache, DEFAULT_MODEL as DEFAULT_IMAGE_MODEL
 from app.utils.templateUpload import generate
-from app.utils.htmlPreview import html_to_png_bytes
+from app.utils.htmlPreview import html_to_png_bytes, html_to_png_bytes_sync
 from app.utils.JWTexpired import require_active_session # This remains crucial!
+from app.utils.eventLoop import run_async
+from app.utils.supabaseClients import get_async_supabase
+from app.utils.jobQueue import job_queue, QueueFullError
+from app.utils.thumbnailWorker import thumbnail_worker
+from app.utils.jsonPatch import diff as json_diff
+from app.utils.workspace import create_workspace, get_workspace_path, GENERATED_FILENAME
+from app.utils.projectStore import (
+    load_project_json,
+    encode_project_version,
+    compress_project_bytes,
+    project_upload_options,
+    project_json_cache,
+    materialized_versions,
+    BytesLRU,
+    ProjectFetchError,
+    FILE_SUFFIXES
+)
 from app.config import (
     OUTPUT_PATH,
+    JOBS_PATH,
+    THUMBNAIL_MODE,
+    THUMBNAIL_PENDING_TIMEOUT,
+    VERSION_DIFF_CACHE_MAX_BYTES,
     SUPABASE_SERVICE_ROLE_KEY, 
     SUPABASE_URL,                         
 )
@@ -52,61 +78,147 @@ GENERATED_DIR = OUTPUT_PATH
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
 
 
+async def run_generation_async(workspace_dir, tone, topic, user_prompt, pdf_file=None):
+    """
+    Runs the generation pipeline, with or without a PDF template.
+    All intermediate and output files are written to workspace_dir.
+    Returns a (success, error_msg) tuple.
+    """
+    if pdf_file:
+        # ConvertAPI upload and download go through the pooled requests session, in a worker thread
+        success, error_msg = await asyncio.to_thread(convert_pdf_to_html, pdf_file, workspace_dir)
+        if not success:
+            return False, error_msg
+
+        await generate(
+            tone=tone,
+            topic=topic,
+            pdf_template=pdf_file,
+            content=user_prompt,
+            input_dir=workspace_dir,
+            output_dir=workspace_dir
+        )
+    else:
+        await no_template_generation_async(
+            user_prompt,
+            workspace_dir,
+            tone,
+            topic
+        )
+
+    return True, None
+
+
+def run_generation(workspace_dir, tone, topic, user_prompt, pdf_file=None):
+    """Synchronous run_generation_async (used by background jobs), run on the worker's shared event loop."""
+    return run_async(run_generation_async(workspace_dir, tone, topic, user_prompt, pdf_file))
+
+
+def generation_job(job_id, params):
+    """Background job handler for /api/generate in job mode."""
+    pdf_path = params.get("pdf_path")
+
+    try:
+        if pdf_path:
+            with open(pdf_path, "rb") as f:
+                pdf_file = FileStorage(stream=f, filename=params["pdf_filename"])
+                success, error_msg = run_generation(params["workspace_dir"], params["tone"], params["topic"], params["user_prompt"], pdf_file)
+        else:
+            success, error_msg = run_generation(params["workspace_dir"], params["tone"], params["topic"], params["user_prompt"])
+    finally:
+        if pdf_path and os.path.exists(pdf_path):
+            os.remove(pdf_path)
+
+    if not success:
+        raise RuntimeError(error_msg)
+
+    return {
+        "message": "Newsletter generated successfully",
+        "output_key": params["output_key"],
+        "redirect_to": f"/editor?output={params['output_key']}"
+    }
+
+
+job_queue.register("generate", generation_job)
+job_queue.resume()
+
+
 @main_bp.route("/api/generate", methods=["POST"])
 @require_active_session
-def generate_newsletter():
+async def generate_newsletter():
     """
     Handles newsletter generation, either with a PDF template or without.
+    With mode=job the work is handed to the background job queue and a job ID
+    is returned immediately; poll /api/jobs/<job_id> for progress.
     Requires an active user session.
     """
     try:
         # Access user_id from the request context set by require_active_session
         user_id = request.current_user_id
 
+        tone = request.form.get("tone", "Professional")
+        topic = request.form.get("topic")
+        user_prompt = request.form.get("user_prompt")
+        file = request.files.get("pdf_file")
+
+        # Each generation writes into its own workspace so requests never share files
+        output_key, workspace_dir = create_workspace(user_id)
+
+        if request.form.get("mode") == "job":
+            params = {
+                "tone": tone,
+                "topic": topic,
+                "user_prompt": user_prompt,
+                "workspace_dir": workspace_dir,
+                "output_key": output_key
+            }
+
+            if file:
+                # Spool the upload to disk so the job can outlive this request (and a restart)
+                os.makedirs(os.path.join(JOBS_PATH, "uploads"), exist_ok=True)
+                params["pdf_filename"] = file.filename
+                params["pdf_path"] = os.path.join(JOBS_PATH, "uploads", f"{uuid.uuid4()}_{secure_filename(file.filename)}")
+                await asyncio.to_thread(file.save, params["pdf_path"])
+
+            try:
+                job_id = job_queue.submit(user_id, "generate", params)
+            except QueueFullError as e:
+                if file and os.path.exists(params["pdf_path"]):
+                    os.remove(params["pdf_path"])
+                return jsonify({"success": False, "error": str(e)}), 503
+
+            return jsonify({
+                "success": True,
+                "job_id": job_id,
+                "status_url": f"/api/jobs/{job_id}",
+                "result_url": f"/api/jobs/{job_id}/result"
+            }), 202
+
         # Handle PDF template upload case
-        if request.files.get("pdf_file"):
-            tone = request.form.get("tone", "Professional")
-            topic = request.form.get("topic")
-            file = request.files.get("pdf_file")
-            user_prompt = request.form.get("user_prompt")
-            
-            success, error_msg = convert_pdf_to_html(file)
+        if file:
+            success, error_msg = await run_generation_async(workspace_dir, tone, topic, user_prompt, file)
             if success:
-                asyncio.run(generate(
-                    tone=tone,
-                    topic=topic,
-                    pdf_template=file,
-                    content=user_prompt
-                ))
-            
                 return jsonify({
                     "success": True,
                     "message": "Newsletter generated successfully with PDF template",
-                    "redirect_to": "/editor"
+                    "output_key": output_key,
+                    "redirect_to": f"/editor?output={output_key}"
                 })
             else:
                 return jsonify({
                     "success": False,
                     "error": error_msg
                 }), 400
-        
+
         # Handle no template case
         else:
-            tone = request.form.get("tone", "Professional")
-            topic = request.form.get("topic")
-            user_prompt = request.form.get("user_prompt")
-            
-            no_template_generation(
-                user_prompt,
-                OUTPUT_PATH,
-                tone,
-                topic
-            )   
-     
+            await run_generation_async(workspace_dir, tone, topic, user_prompt)
+
             return jsonify({
                 "success": True,
                 "message": "Newsletter generated successfully without template",
-                "redirect_to": "/editor"
+                "output_key": output_key,
+                "redirect_to": f"/editor?output={output_key}"
             })
             
     except Exception as e:
@@ -117,15 +229,135 @@ def generate_newsletter():
         }), 500
 
 
+def format_sse(event, data):
+    """Formats one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@main_bp.route("/api/generate/stream", methods=["POST"])
+@require_active_session
+async def generate_newsletter_stream():
+    """
+    Template-less generation streamed over server-sent events.
+    HTML chunks are sent as they arrive from the model, followed by a final
+    'done' event carrying the validated HTML and its output key.
+    Requires an active user session.
+    """
+    user_id = request.current_user_id
+    data = request.form if request.form else (request.get_json(silent=True) or {})
+    tone = data.get("tone", "Professional")
+    topic = data.get("topic")
+    user_prompt = data.get("user_prompt")
+
+    if not user_prompt:
+        return jsonify({"success": False, "error": "user_prompt is required"}), 400
+
+    output_key, workspace_dir = create_workspace(user_id)
+    logger = current_app.logger
+
+    async def events():
+        try:
+            async for event, payload in stream_no_template_generation(user_prompt, workspace_dir, tone, topic):
+                if event == "done":
+                    payload = {
+                        **payload,
+                        "output_key": output_key,
+                        "redirect_to": f"/editor?output={output_key}"
+                    }
+                yield format_sse(event, payload)
+        except Exception as e:
+            logger.error(f"Error in generate_newsletter_stream: {e}", exc_info=True)
+            yield format_sse("error", {"error": "Internal server error during generation"})
+
+    # The async body is streamed from the event loop by asgi.py (NewsletterApp.ensure_sync adapts it for WSGI)
+    return Response(
+        events(),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # keep reverse proxies from buffering the stream
+        }
+    )
+
+
+@main_bp.route("/api/jobs/<string:job_id>")
+@require_active_session
+def get_job_status(job_id):
+    """Returns the status of a background job owned by the logged-in user."""
+    job = job_queue.get(job_id, request.current_user_id)
+    if not job:
+        return jsonify({"error": "Job not found or access denied"}), 404
+
+    job.pop("result", None)
+    return jsonify({"success": True, "job": job}), 200
+
+
+@main_bp.route("/api/jobs/<string:job_id>/result")
+@require_active_session
+def get_job_result(job_id):
+    """
+    Returns the result of a finished job.
+    Responds 202 while the job is still queued or running.
+    """
+    job = job_queue.get(job_id, request.current_user_id)
+    if not job:
+        return jsonify({"error": "Job not found or access denied"}), 404
+
+    if job["status"] == "failed":
+        return jsonify({"success": False, "status": job["status"], "error": job["error"] or "Generation failed"}), 500
+    if job["status"] != "done":
+        return jsonify({"success": True, "status": job["status"]}), 202
+
+    return jsonify({"success": True, "status": job["status"], **job["result"]}), 200
+
+
 @main_bp.route("/api/generated_output.html")
 def serve_generated():
-    """Serves the latest generated HTML output file."""
+    """Serves the legacy shared generated HTML output file."""
     return send_from_directory(GENERATED_DIR, "generated_output.html")
 
 
+@main_bp.route("/api/generated/<string:output_key>")
+@require_active_session
+def serve_generated_for_job(output_key):
+    """Serves the generated HTML of one generation, identified by its output key."""
+    workspace_dir = get_workspace_path(request.current_user_id, output_key)
+    if not workspace_dir or not os.path.exists(os.path.join(workspace_dir, GENERATED_FILENAME)):
+        return jsonify({"error": "Generated output not found or expired"}), 404
+
+    return send_from_directory(workspace_dir, GENERATED_FILENAME)
+
+
+@main_bp.route("/api/stats/cache")
+@require_active_session
+def cache_stats():
+    """Returns hit/miss counters of the server-side caches (and background worker counters) for this worker."""
+    return jsonify({
+        "success": True,
+        "caches": {
+            "pdf_conversion": conversion_cache.stats(),
+            "transform_text": transform_cache.stats(),
+            "generated_images": image_cache.stats(),
+            "project_json": project_json_cache.stats(),
+            "materialized_versions": materialized_versions.stats(),
+            "version_diffs": version_diffs.stats()
+        },
+        "workers": {
+            "thumbnails": thumbnail_worker.stats()
+        }
+    }), 200
+
+
+@main_bp.route("/api/stats/generation")
+@require_active_session
+def generation_stats():
+    """Returns template-less generation counters (model calls, retries, local repairs) for this worker."""
+    return jsonify({"success": True, "generation": get_generation_stats()}), 200
+
+
 @main_bp.route("/api/transformText", methods=["POST"])
 @require_active_session
-def transform_text():
+async def transform_text():
     """
     Transforms text based on provided tone and prompt.
     Requires an active user session.
@@ -139,39 +371,243 @@ def transform_text():
         return jsonify({"error": "No input text provided"}), 400
     
     try:
-        transformed = transformText(text, tone, prompt)
+        transformed = await transformTextAsync(text, tone, prompt)
         return jsonify({"transformed": transformed})
     except Exception as e:
         current_app.logger.error(f"Error in transform_text: {e}", exc_info=True)
         return jsonify({"error": "Internal server error during text transformation"}), 500
 
 
+@main_bp.route("/api/transformText/batch", methods=["POST"])
+@require_active_session
+async def transform_text_batch():
+    """
+    Transforms many text blocks in one request.
+    Expects {"blocks": [{"id": ..., "text": ...}], "tone": ..., "prompt": ...} and
+    returns the rewritten texts mapped back to their block IDs.
+    Requires an active user session.
+    """
+    data = request.json or {}
+    blocks = data.get("blocks") or []
+    tone = data.get("tone", "Formal").strip()
+    prompt = data.get("prompt", "").strip()
+
+    if not isinstance(blocks, list) or not blocks:
+        return jsonify({"error": "No blocks provided"}), 400
+    if len(blocks) > 500:
+        return jsonify({"error": "Too many blocks in one request (max 500)"}), 400
+
+    block_texts = {}
+    for block in blocks:
+        if not isinstance(block, dict) or block.get("id") is None:
+            return jsonify({"error": "Every block needs an id and a text"}), 400
+        text = str(block.get("text") or "").strip()
+        if text:
+            block_texts[str(block["id"])] = text
+
+    if not block_texts:
+        return jsonify({"error": "No input text provided"}), 400
+
+    try:
+        transformed, failed, llm_calls = await transformTextBatchAsync(block_texts, tone, prompt)
+        return jsonify({"transformed": transformed, "failed": failed, "llm_calls": llm_calls})
+    except Exception as e:
+        current_app.logger.error(f"Error in transform_text_batch: {e}", exc_info=True)
+        return jsonify({"error": "Internal server error during text transformation"}), 500
+
+
 @main_bp.route("/api/generateImage", methods=["POST"])
-def generate_image_api():
-    """Generates an image based on a user prompt."""
-    user_prompt = request.json.get("prompt")
+async def generate_image_api():
+    """
+    Generates an image based on a user prompt.
+    By default the image is returned as a URL to the cached blob; pass
+    "delivery": "base64" for the inline base64 form. An optional "format"
+    (png, jpeg, webp) forces the output format, and an optional "model" must be
+    one of the allowed models (IMAGE_ALLOWED_MODELS plus the default).
+    """
+    data = request.json or {}
+    user_prompt = data.get("prompt")
     if not user_prompt:
         return jsonify({"error": "No prompt provided for image generation"}), 400
     try:
-        result = generate_image(user_prompt)
-        image_base64 = result["image_base64"]
-        mime_type = result["mime_type"]
-        return jsonify({"image_base64": image_base64, "mime_type": mime_type})
+        result = await generate_image_async(
+            user_prompt,
+            model=data.get("model") or DEFAULT_IMAGE_MODEL,
+            output_format=data.get("format")
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error in generate_image_api: {e}", exc_info=True)
         return jsonify({"error": "Internal server error during image generation"}), 500
 
+    if data.get("delivery") == "base64":
+        cached = await asyncio.to_thread(get_cached_image, result["cache_key"])
+        if not cached:
+            return jsonify({"error": "Generated image is no longer available"}), 500
+        return jsonify({"image_base64": base64.b64encode(cached[0]).decode("utf-8"), "mime_type": cached[1]})
+
+    return jsonify({
+        "image_url": f"/api/images/{result['cache_key']}",
+        "mime_type": result["mime_type"],
+        "cached": result["cached"]
+    })
+
+
+@main_bp.route("/api/generateImages/fill", methods=["POST"])
+@require_active_session
+def fill_images_api():
+    """
+    Generates images for every placeholder <img> of a generated template at once.
+    Expects {"html": ..., "format": optional, "inline": optional bool} and returns
+    the rewritten HTML plus a per-image mapping. Images are embedded as data URLs
+    unless "inline" is false; the /api/images/<key> URLs used then (and always in
+    the mapping) point into an evictable per-instance cache and must not be saved.
+    Requires an active user session.
+    """
+    data = request.json or {}
+    html = data.get("html")
+    if not html:
+        return jsonify({"error": "No HTML provided"}), 400
+    try:
+        filled_html, images = fill_placeholder_images(
+            html,
+            output_format=data.get("format"),
+            inline=bool(data.get("inline", True))
+        )
+        return jsonify({
+            "success": True,
+            "html": filled_html,
+            "images": images,
+            "failed": sum(1 for image in images if "error" in image)
+        })
+    except Exception as e:
+        current_app.logger.error(f"Error in fill_images_api: {e}", exc_info=True)
+        return jsonify({"error": "Internal server error during image generation"}), 500
+
+
+@main_bp.route("/api/images/<string:cache_key>")
+def serve_generated_image(cache_key):
+    """Serves a generated image from the image cache. Content never changes for a key."""
+    if request.headers.get("If-None-Match") == f'"{cache_key}"':
+        return Response(status=304)
+
+    cached = get_cached_image(cache_key)
+    if not cached:
+        return jsonify({"error": "Image not found or expired"}), 404
+
+    image_bytes, mime_type = cached
+    return Response(image_bytes, mimetype=mime_type, headers={
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "ETag": f'"{cache_key}"'
+    })
+
 
 # =============================================================================
 # SAVING and DELETION SECTION
 # =============================================================================
 
 PROJECTS_TABLE = 'projects'
+THUMBNAIL_WIDTH = 600
+THUMBNAIL_HEIGHT = 400
+
+# Serializes and compresses saved project JSON (may download the previous version) off the event loop
+save_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="save")
+
+
+def thumbnail_hash(html):
+    """Hash of the whitespace-normalized page HTML and thumbnail size, used to name thumbnails."""
+    normalized = re.sub(r"\s+", " ", html or "").strip()
+    return hashlib.sha256(f"{THUMBNAIL_WIDTH}x{THUMBNAIL_HEIGHT}\x1f{normalized}".encode("utf-8")).hexdigest()[:32]
+
+
+def extract_public_url(public_url_response):
+    """Handles the different response formats of get_public_url across supabase-py versions."""
+    if hasattr(public_url_response, 'publicUrl'):
+        return public_url_response.publicUrl
+    if hasattr(public_url_response, 'public_url'):
+        return public_url_response.public_url
+    if isinstance(public_url_response, dict):
+        return public_url_response.get('publicUrl') or public_url_response.get('public_url')
+    if isinstance(public_url_response, str): # Direct string might be returned in some versions
+        return public_url_response
+    return None
+
+
+def upload_to_templates(path, data, file_options):
+    """
+    Uploads bytes to the templates bucket and returns their public URL.
+    Raises RuntimeError when the upload fails or no public URL can be derived.
+    """
+    bucket = supabase.storage.from_("templates")
+    upload_response = bucket.upload(path, data, file_options)
+
+    # Check if upload_response has an error (Supabase-py client returns an object with 'error' attr)
+    if hasattr(upload_response, 'error') and upload_response.error:
+        raise RuntimeError(upload_response.error.get('message', 'Unknown upload error'))
+
+    public_url = extract_public_url(bucket.get_public_url(path))
+    if not public_url:
+        raise RuntimeError(f"Failed to generate public URL for {path}")
+    return public_url
+
+
+async def upload_to_templates_async(path, data, file_options):
+    """Awaitable upload_to_templates, through the async Supabase client of the running loop."""
+    bucket = (await get_async_supabase()).storage.from_("templates")
+    upload_response = await bucket.upload(path, data, file_options)
+
+    if hasattr(upload_response, 'error') and upload_response.error:
+        raise RuntimeError(upload_response.error.get('message', 'Unknown upload error'))
+
+    public_url = extract_public_url(await bucket.get_public_url(path))
+    if not public_url:
+        raise RuntimeError(f"Failed to generate public URL for {path}")
+    return public_url
+
+
+def render_thumbnail(project_id, html):
+    """Renders a save thumbnail and uploads it under its content hash. Returns its public URL."""
+    image_bytes = html_to_png_bytes_sync(html, width = THUMBNAIL_WIDTH, height = THUMBNAIL_HEIGHT)
+    filename_img = f"{project_id}_thumb_{thumbnail_hash(html)}.png"
+    return upload_to_templates(f"projects/{filename_img}", image_bytes, {"content-type": "image/png", "upsert": "true"})
+
+
+async def render_thumbnail_async(project_id, html):
+    """Awaitable render_thumbnail."""
+    image_bytes = await html_to_png_bytes(html, width = THUMBNAIL_WIDTH, height = THUMBNAIL_HEIGHT)
+    filename_img = f"{project_id}_thumb_{thumbnail_hash(html)}.png"
+    return await upload_to_templates_async(f"projects/{filename_img}", image_bytes, {"content-type": "image/png", "upsert": "true"})
+
+
+def deferred_thumbnail(task):
+    """Background thumbnail task: renders the page and fills in image_path of the saved row."""
+    image_path = render_thumbnail(task["project_id"], task["html"])
+    supabase.table(PROJECTS_TABLE).update({"image_path": image_path}).eq("id", task["row_id"]).eq("user_id", task["user_id"]).execute()
+
+
+def superseded_thumbnail(task):
+    """A newer save of the project replaced this task; mark the row as having no thumbnail instead of pending."""
+    supabase.table(PROJECTS_TABLE).update({"image_path": ""}).eq("id", task["row_id"]).eq("user_id", task["user_id"]).execute()
+
+
+def is_thumbnail_pending(row):
+    """A row saved in deferred mode has a null image_path until its thumbnail is rendered."""
+    if row.get("image_path") is not None:
+        return False
+    try:
+        saved_at = datetime.fromisoformat(str(row.get("created_at")).replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        return False
+    return (datetime.utcnow() - saved_at).total_seconds() < THUMBNAIL_PENDING_TIMEOUT
+
+
+thumbnail_worker.start(deferred_thumbnail, superseded_thumbnail)
 
 
 @main_bp.route("/api/upload-project", methods=["POST"])
 @require_active_session
-def upload_project():
+async def upload_project():
         """
         Uploads or updates a project (newsletter) to Supabase Storage and Database.
         Requires an active user session.
@@ -188,6 +624,7 @@ def upload_project():
             status = data.get("status", "DRAFT")
             incoming_project_id = data.get("project_id")
             fullHtml = data.get("project_fullHtml")
+            defer_thumbnail = bool(data.get("defer_thumbnail", THUMBNAIL_MODE == "deferred"))
             
             if not project_name:
                 return jsonify({"error": "project_name is required"}), 400
@@ -196,6 +633,8 @@ def upload_project():
 
             timestamp = datetime.utcnow().isoformat()
 
+            previous_json_path = None
+            previous_image_path = None
             if not incoming_project_id:
                 project_id = str(uuid.uuid4())
                 version = 1
@@ -203,8 +642,9 @@ def upload_project():
                 project_id = incoming_project_id
                 
                 try:
-                    query = supabase.table(PROJECTS_TABLE)\
-                        .select("version")\
+                    async_supabase = await get_async_supabase()
+                    query = await async_supabase.table(PROJECTS_TABLE)\
+                        .select("version, json_path, image_path")\
                         .eq("project_id", project_id)\
                         .eq("user_id", user_id)\
                         .order("version", desc=True)\
@@ -221,79 +661,53 @@ def upload_project():
                     
                     latest_version = query.data[0]["version"]
                     version = latest_version + 1
+                    previous_json_path = query.data[0].get("json_path")
+                    previous_image_path = query.data[0].get("image_path")
                     
                 except Exception as e:
                     current_app.logger.error(f"Error fetching project version: {e}", exc_info=True)
                     return jsonify({"error": f"Database query failed: {str(e)}"}), 500
                 
-            # Create filename for storage
-            filename = f"{project_id}_v{version}_{int(datetime.utcnow().timestamp())}.json"
-            filename_img = f"{project_id}_v{version}_{int(datetime.utcnow().timestamp())}.png"
+            timestamp_suffix = int(datetime.utcnow().timestamp())
+
+            def encode_json():
+                # Serialize compactly (a JSON patch against the previous version in the delta storage mode) and compress
+                json_bytes, storage_kind = encode_project_version(project_data, previous_json_path)
+                return (*compress_project_bytes(json_bytes), storage_kind)
+
+            async def store_json():
+                json_bytes, content_encoding, storage_kind = await asyncio.get_running_loop().run_in_executor(save_executor, encode_json)
+                filename = f"{project_id}_v{version}_{timestamp_suffix}{FILE_SUFFIXES[content_encoding]}"
+                return await upload_to_templates_async(f"projects/{filename}", json_bytes, project_upload_options(content_encoding)), storage_kind
+
+            async def store_thumbnail():
+                # Thumbnails are named after the hash of the rendered HTML, so an unchanged page reuses the previous image
+                html_hash = thumbnail_hash(fullHtml)
+                if previous_image_path and f"_thumb_{html_hash}" in previous_image_path:
+                    return previous_image_path, True
+                if defer_thumbnail:
+                    # Inserted as pending (null image_path), rendered by thumbnail_worker after the save returns
+                    return None, False
+                return await render_thumbnail_async(project_id, fullHtml), False
+
+            # The JSON and the thumbnail are independent, so they are prepared and uploaded side by side
+            json_result, thumbnail_result = await asyncio.gather(store_json(), store_thumbnail(), return_exceptions=True)
 
             try:
-                # Convert project data to appropriate datatype
-                json_bytes = json.dumps(project_data, indent=2).encode("utf-8")
-                image_bytes = asyncio.run(html_to_png_bytes(fullHtml, width = 600, height = 400))
-                
-                # Upload JSON file to Supabase Storage
-                upload_response = supabase.storage.from_("templates").upload(
-                    f"projects/{filename}",
-                    json_bytes,
-                    {"content-type": "application/json"},
-                )
-
-                # Check if upload_response has an error (Supabase-py client returns an object with 'error' attr)
-                if hasattr(upload_response, 'error') and upload_response.error:
-                    current_app.logger.error(f"JSON upload failed: {upload_response.error}", exc_info=True)
-                    return jsonify({"error": f"JSON upload failed: {upload_response.error.get('message', 'Unknown upload error')}"}), 500
-                
-                img_upload = supabase.storage.from_("templates").upload(
-                    f"projects/{filename_img}",
-                    image_bytes,
-                    {"content-type": "image/png"}
-                )
-
-                if hasattr(img_upload, 'error') and img_upload.error:
-                    current_app.logger.error(f"Image upload failed: {img_upload.error}", exc_info=True)
-                    return jsonify({"error": f"Image upload failed: {img_upload.error.get('message', 'Unknown image upload error')}"}), 500
-        
+                if isinstance(json_result, BaseException):
+                    raise json_result
+                public_url, storage_kind = json_result
             except Exception as e:
-                current_app.logger.error(f"File preparation/upload failed: {e}", exc_info=True)
-                return jsonify({"error": f"File upload failed: {str(e)}"}), 500
+                current_app.logger.error(f"JSON upload failed: {e}", exc_info=True)
+                return jsonify({"error": f"JSON upload failed: {str(e)}"}), 500
 
             try:
-                # Get public URL for the uploaded file
-                public_url_response = supabase.storage.from_("templates").get_public_url(f"projects/{filename}")
-                img_publicUrl_response = supabase.storage.from_("templates").get_public_url(f"projects/{filename_img}")
-                
-                # Handle different response formats for public URL
-                public_url = None
-                if hasattr(public_url_response, 'publicUrl'):
-                    public_url = public_url_response.publicUrl
-                elif hasattr(public_url_response, 'public_url'):
-                    public_url = public_url_response.public_url
-                elif isinstance(public_url_response, dict):
-                    public_url = public_url_response.get('publicUrl') or public_url_response.get('public_url')
-                elif isinstance(public_url_response, str): # Direct string might be returned in some versions
-                    public_url = public_url_response
-                
-                img_publicUrl = None
-                if hasattr(img_publicUrl_response, 'publicUrl'):
-                    img_publicUrl = img_publicUrl_response.publicUrl
-                elif hasattr(img_publicUrl_response, 'public_url'):
-                    img_publicUrl = img_publicUrl_response.public_url
-                elif isinstance(img_publicUrl_response, dict):
-                    img_publicUrl = img_publicUrl_response.get('publicUrl') or img_publicUrl_response.get('public_url')
-                elif isinstance(img_publicUrl_response, str):
-                    img_publicUrl = img_publicUrl_response
-                
-                if not public_url or not img_publicUrl:
-                    current_app.logger.error("Failed to extract public URL for JSON or Image.")
-                    return jsonify({"error": "Failed to generate public URLs for files"}), 500
-                
+                if isinstance(thumbnail_result, BaseException):
+                    raise thumbnail_result
+                img_publicUrl, thumbnail_reused = thumbnail_result
             except Exception as e:
-                current_app.logger.error(f"Error getting public URLs: {e}", exc_info=True)
-                return jsonify({"error": f"Failed to get public URLs: {str(e)}"}), 500
+                current_app.logger.error(f"Image upload failed: {e}", exc_info=True)
+                return jsonify({"error": f"Image upload failed: {str(e)}"}), 500
 
             try:
                 # Insert new row in database
@@ -309,7 +723,7 @@ def upload_project():
                     "updated_at": timestamp
                 }
                 
-                insert_response = supabase.table(PROJECTS_TABLE).insert(insert_data).execute()
+                insert_response = await (await get_async_supabase()).table(PROJECTS_TABLE).insert(insert_data).execute()
 
                 if hasattr(insert_response, 'error') and insert_response.error:
                     current_app.logger.error(f"Database insert failed: {insert_response.error}", exc_info=True)
@@ -319,6 +733,15 @@ def upload_project():
                 current_app.logger.error(f"Database insert operation failed: {e}", exc_info=True)
                 return jsonify({"error": f"Database insert failed: {str(e)}"}), 500
 
+            thumbnail_pending = img_publicUrl is None
+            if thumbnail_pending:
+                thumbnail_worker.submit(project_id, {
+                    "project_id": project_id,
+                    "row_id": insert_response.data[0]['id'],
+                    "user_id": user_id,
+                    "html": fullHtml
+                })
+
             # Return success response
             response_data = {
                 "success": True,
@@ -328,6 +751,9 @@ def upload_project():
                 "version": version,
                 "status": status,
                 "json_path": public_url,
+                "storage": storage_kind,
+                "thumbnail_reused": thumbnail_reused,
+                "thumbnail_pending": thumbnail_pending,
                 "project_name":project_name
             }
             
@@ -338,37 +764,138 @@ def upload_project():
             return jsonify({"error": f"Internal server error: {str(e)}"}), 500
         
 
+# Columns needed by list views; json_path is only sent when explicitly requested
+LIST_COLUMNS = "id, project_id, project_name, status, version, image_path, created_at, updated_at"
+NEWSLETTER_STATUSES = ('DRAFT', 'PUBLISHED', 'ARCHIVED')
+DEFAULT_PAGE_SIZE = 100  # used for ?cursor= requests without ?limit=
+MAX_PAGE_SIZE = 500
+VERSION_COLUMNS = "id, project_id, project_name, status, version, created_at, updated_at, image_path"
+DEFAULT_VERSIONS_PAGE_SIZE = 50
+
+# Serialized version diffs keyed by the (from, to) json_path pair
+version_diffs = BytesLRU(VERSION_DIFF_CACHE_MAX_BYTES)
+
+# Per-status listing queries run side by side
+listing_executor = ThreadPoolExecutor(max_workers=6, thread_name_prefix="listing")
+
+
+def encode_cursor(row, sort_key="updated_at"):
+    """Opaque keyset cursor pointing just after this row in (sort_key, id) DESC order."""
+    return base64.urlsafe_b64encode(json.dumps([row[sort_key], str(row["id"])]).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    updated_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    return str(updated_at), str(row_id)
+
+
+def parse_listing_args():
+    """
+    Reads ?status=, ?limit=, ?cursor= and ?include=json_path.
+    Without ?limit= (and ?cursor=) every row of a status is returned, as before pagination.
+    Raises ValueError on malformed input.
+    """
+    limit = request.args.get("limit")
+    if limit is not None or request.args.get("cursor"):
+        limit = min(max(int(limit or DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+
+    status = request.args.get("status")
+    if status and status.upper() not in NEWSLETTER_STATUSES:
+        raise ValueError(f"Unknown status: {status}")
+    statuses = (status.upper(),) if status else NEWSLETTER_STATUSES
+
+    cursor = request.args.get("cursor")
+    if cursor and not status:
+        raise ValueError("cursor requires a status")
+    if cursor:
+        # Both cursor fields end up in the PostgREST filter, so only accept their real types
+        updated_at, row_id = decode_cursor(cursor)
+        cursor = datetime.fromisoformat(updated_at).isoformat(), str(uuid.UUID(row_id))
+
+    columns = LIST_COLUMNS + (", json_path" if request.args.get("include") == "json_path" else "")
+    return statuses, limit, cursor, columns
+
+
+def fetch_status_page(make_query, status, limit, cursor):
+    """
+    Fetches one keyset page of rows with the given status, newest first (all rows when limit is None).
+    The count is computed by PostgREST in SQL and only requested for first pages.
+    Statuses are matched case-insensitively and unrecognized ones are listed as DRAFT.
+    """
+    query = make_query(count="exact" if limit and not cursor else None)
+    if status == 'DRAFT':
+        for other in NEWSLETTER_STATUSES:
+            if other != 'DRAFT':
+                query = query.not_.ilike("status", other)
+    else:
+        query = query.ilike("status", status)
+    query = query.order("updated_at", desc=True).order("id", desc=True)
+    if limit:
+        query = query.limit(limit + 1)
+
+    if cursor:
+        updated_at, row_id = cursor
+        query = query.or_(f'updated_at.lt."{updated_at}",and(updated_at.eq."{updated_at}",id.lt."{row_id}")')
+
+    result = query.execute()
+    rows = result.data or []
+    if not limit:
+        return rows, None, len(rows)
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor, result.count
+
+
+def listing_response(make_query):
+    """Builds the grouped, paginated listing payload and answers 304 when the client copy is current."""
+    try:
+        statuses, limit, cursor, columns = parse_listing_args()
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f"Invalid listing parameters: {e}"}), 400
+
+    futures = {
+        status: listing_executor.submit(fetch_status_page, lambda count: make_query(columns, count), status, limit, cursor)
+        for status in statuses
+    }
+
+    grouped, next_cursors, counts = {status: [] for status in NEWSLETTER_STATUSES}, {}, {}
+    for status, future in futures.items():
+        grouped[status], next_cursors[status], count = future.result()
+        if count is not None:
+            counts[status] = count
+
+    payload = {'success': True, 'data': grouped, 'next_cursors': next_cursors}
+    if counts:
+        payload['counts'] = counts
+
+    # The ETag is derived from the payload, so a 304 saves the transfer and client-side
+    # work but not the queries above
+    etag = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:32]
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(payload)
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
 @main_bp.route('/api/newsletters', methods=['GET'])
 @require_active_session
 def get_user_newsletters():
     """
-    Fetches all newsletters for the logged-in user based on user_id.
+    Fetches the newsletter version rows of the logged-in user, grouped by status.
+    With ?limit= each status is a keyset-paginated page (?status= with ?cursor=
+    for the next ones) with its total count; without it every row is returned.
+    json_path is only included with ?include=json_path.
     Requires an active user session.
     """
     try:
         user_id = request.current_user_id # Get user ID from decorator
-        
-        result = supabase.table(PROJECTS_TABLE).select("*").eq('user_id', user_id).execute()
-        
-        if hasattr(result, 'error') and result.error:
-            current_app.logger.error(f"Supabase error fetching user newsletters: {result.error}", exc_info=True)
-            return jsonify({'error': 'Database query failed'}), 500
 
-        newsletters = result.data
-    
-        grouped = {
-            'DRAFT': [],
-            'PUBLISHED': [],
-            'ARCHIVED': []
-        }
+        def make_query(columns, count):
+            return supabase.table(PROJECTS_TABLE).select(columns, count=count).eq('user_id', user_id)
 
-        for newsletter in newsletters:
-            status = newsletter.get('status', 'DRAFT').upper()
-            if status not in grouped:
-                status = 'DRAFT' # Default to DRAFT if status is unrecognized
-            grouped[status].append(newsletter)
-
-        return jsonify({'success': True, 'data': grouped}), 200
+        return listing_response(make_query)
 
     except Exception as e:
         current_app.logger.error(f"Error in get_user_newsletters: {e}", exc_info=True)
@@ -380,41 +907,51 @@ def get_latest_project_versions_rpc():
     """
     Calls the 'get_latest_project_versions' PostgreSQL function
     to retrieve entries with the highest version for each project_id.
+    Filtering, ordering, pagination and counts are applied to the function's
+    result set in SQL; see get_user_newsletters for the query parameters.
     Requires an active user session.
     """
     try:
-    
         user_id = request.current_user_id 
-        response = supabase.rpc('get_latest_project_versions', {'p_user_id': user_id}).execute()
-        data = response.data
 
-        if hasattr(response, 'error') and response.error:
-            current_app.logger.error(f"Supabase RPC error: {response.error}", exc_info=True)
-            return jsonify({'error': 'RPC call failed'}), 500
+        def make_query(columns, count):
+            return supabase.rpc('get_latest_project_versions', {'p_user_id': user_id}, count=count).select(columns)
 
-
-        grouped = {
-            'DRAFT': [],
-            'PUBLISHED': [],
-            'ARCHIVED': []
-        }
-
-        if data:
-            for project in data:
-                status = project.get('status', 'DRAFT').upper() # Default to DRAFT
-                if status not in grouped:
-                    status = 'DRAFT' # Fallback
-                grouped[status].append(project)
-            return jsonify({'success': True, 'data': grouped}), 200
-        else:
-            current_app.logger.info("No data found or RPC function returned an empty set for latest versions.")
-            return jsonify({'success': True, 'data': grouped}), 200 # Return empty grouped object
+        return listing_response(make_query)
 
     except Exception as e:
         current_app.logger.error(f"An error occurred during the RPC call: {e}", exc_info=True)
         return jsonify({'error': "Internal server error during RPC call"}), 500
 
 
+def project_json_response(row):
+    """
+    Responds with a project row whose json_path is replaced by the JSON document it points to.
+    The cached document bytes are spliced into the response as-is, without a parse/serialize round trip.
+    """
+    json_path = row.get("json_path")
+    etag = hashlib.sha256(json.dumps(row, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:32]
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        try:
+            raw = load_project_json(json_path)
+        except ProjectFetchError as e:
+            current_app.logger.error(f"{e} (json_path: {json_path})", exc_info=True)
+            if e.decode_error:
+                return jsonify({"error": "Failed to decode project data"}), 500
+            return jsonify({"error": "Failed to fetch JSON from Supabase storage"}), 500
+
+        fields = {key: value for key, value in row.items() if key != "json_path"}
+        head = json.dumps(fields)[:-1].encode("utf-8")
+        body = head + (b', ' if fields else b'') + b'"json_path": ' + raw + b'}'
+        response = Response(body, status=200, mimetype="application/json")
+
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
 @main_bp.route('/api/newsletters/<string:id>')
 @require_active_session
 def get_newsletter_using_id(id):
@@ -432,21 +969,7 @@ def get_newsletter_using_id(id):
 
         if result.data:
             row = result.data[0]
-            json_path = row.get("json_path")
-            
-            # Fetch JSON content from the public URL
-            response = requests.get(json_path)
-            if response.status_code != 200:
-                current_app.logger.error(f"Failed to fetch JSON from Supabase storage for ID {id}: Status {response.status_code}", exc_info=True)
-                return jsonify({"error": "Failed to fetch JSON from Supabase storage"}), 500
-
-            try:
-                row["json_path"] = response.json() # Replace path with actual JSON content
-            except json.JSONDecodeError:
-                current_app.logger.error(f"Failed to decode JSON from {json_path}", exc_info=True)
-                return jsonify({"error": "Failed to decode project data"}), 500
-
-            return jsonify(row), 200
+            return project_json_response(row)
         else:
              return jsonify({"error":"Could not find file or access denied"}), 404 # Return 404 if not found
     except Exception as e:
@@ -516,7 +1039,7 @@ def restore_newsletter(newsletter_id):
 # =============================================================================
 
 @main_bp.route("/api/delete/<string:id>", methods=["DELETE"])
-@require_active_session
+@require_active_session(verify_remote=True) # destructive, so a revoked session must not get through
 def delete(id):
     """
     Deletes a specific newsletter entry by its primary key 'id'.
@@ -525,19 +1048,8 @@ def delete(id):
     try:
         user_id = request.current_user_id # Get user ID from decorator
 
-        # Check if the project exists and belongs to the user before attempting deletion
-        # This prevents a user from deleting another user's project if they somehow guess the ID
-        check_ownership_result = supabase.table(PROJECTS_TABLE).select('id').eq('id', id).eq('user_id', user_id).execute()
-
-        if hasattr(check_ownership_result, 'error') and check_ownership_result.error:
-            current_app.logger.error(f"Supabase ownership check error (delete): {check_ownership_result.error}", exc_info=True)
-            return jsonify({"error": "Database error during ownership check"}), 500
-            
-        if not check_ownership_result.data:
-            return jsonify({"error": "File not found or access denied"}), 404
-
-        # If ownership confirmed, proceed with deletion
-        result = supabase.table(PROJECTS_TABLE).delete().eq('id', id).execute()
+        # Ownership is part of the DELETE itself, so another user's project simply matches no row
+        result = supabase.table(PROJECTS_TABLE).delete().eq('id', id).eq('user_id', user_id).execute()
         
         if hasattr(result, 'error') and result.error:
             current_app.logger.error(f"Supabase deletion error: {result.error}", exc_info=True)
@@ -547,7 +1059,7 @@ def delete(id):
         if result.data:
             return jsonify({"success": True, "message":"File deletion successful!"}), 200
         else:
-            return jsonify({"success": False, "message":"File not found or already deleted"}), 404 # Should be caught by ownership check, but as a fallback
+            return jsonify({"error": "File not found or access denied"}), 404
     except Exception as e:
         current_app.logger.error(f"Error in delete route: {e}", exc_info=True)
         return jsonify({"error": "Internal server error during deletion"}), 500
@@ -563,12 +1075,14 @@ async def duplicate(id):
     """
     Duplicates an existing newsletter project for the logged-in user.
     Requires an active user session and validates user ownership.
+    Runs on the worker's event loop with the async Supabase client.
     """
     try:
         user_id = request.current_user_id # Get user ID from decorator
+        async_supabase = await get_async_supabase()
         
         # Fetch the original project data
-        result = supabase.table(PROJECTS_TABLE).select('project_id','project_name','status','json_path','image_path').eq('id', id).eq('user_id',user_id).execute()
+        result = await async_supabase.table(PROJECTS_TABLE).select('project_id','project_name','status','json_path','image_path').eq('id', id).eq('user_id',user_id).execute()
         if hasattr(result, 'error') and result.error:
             current_app.logger.error(f"Supabase query error (duplicate): {result.error}", exc_info=True)
             return jsonify({"error": "Database query failed"}), 500
@@ -593,7 +1107,8 @@ async def duplicate(id):
         #     # Add logic here to ensure true uniqueness for the user if necessary
         #     return unique_name
         
-        new_project_name = get_unique_project_name(row["project_name"], user_id, current_project_id=None)
+        # Name allocation shares the sync query with the batch routes; keep it off the event loop
+        new_project_name = await asyncio.to_thread(get_unique_project_name, row["project_name"], user_id, current_project_id=None)
         
         insert_data = {
             "user_id": user_id,
@@ -607,7 +1122,7 @@ async def duplicate(id):
             "updated_at": timestamp
         }
         
-        insert_response = supabase.table(PROJECTS_TABLE).insert(insert_data).execute()
+        insert_response = await async_supabase.table(PROJECTS_TABLE).insert(insert_data).execute()
         
         if hasattr(insert_response, 'error') and insert_response.error:
             current_app.logger.error(f"Database insert for duplicate failed: {insert_response.error}", exc_info=True)
@@ -627,6 +1142,158 @@ async def duplicate(id):
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
 
+# =============================================================================
+# BATCH OPERATIONS SECTION
+# =============================================================================
+
+BATCH_MAX_ITEMS = 100
+
+
+def parse_batch_ids():
+    """
+    Reads {"ids": [...]} from the request body.
+    Returns the de-duplicated list of row ids, or raises ValueError.
+    """
+    data = request.get_json(silent=True) or {}
+    ids = data.get("ids")
+    if not isinstance(ids, list) or not ids:
+        raise ValueError("ids must be a non-empty list")
+    if len(ids) > BATCH_MAX_ITEMS:
+        raise ValueError(f"At most {BATCH_MAX_ITEMS} ids per request")
+    try:
+        # Row ids are UUIDs; anything else would only make the whole statement fail
+        return list(dict.fromkeys(str(uuid.UUID(str(row_id))) for row_id in ids))
+    except ValueError:
+        raise ValueError("ids must be UUIDs")
+
+
+@main_bp.route("/api/batch/delete", methods=["POST"])
+@require_active_session(verify_remote=True) # destructive, so a revoked session must not get through
+def batch_delete():
+    """
+    Deletes several newsletter entries in one statement.
+    Only rows owned by the user are deleted; the others are reported as not found.
+    """
+    try:
+        user_id = request.current_user_id
+        try:
+            ids = parse_batch_ids()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        result = supabase.table(PROJECTS_TABLE).delete().in_('id', ids).eq('user_id', user_id).execute()
+        if hasattr(result, 'error') and result.error:
+            current_app.logger.error(f"Supabase batch deletion error: {result.error}", exc_info=True)
+            return jsonify({"error": "Batch deletion failed"}), 500
+
+        deleted = {str(row['id']) for row in result.data or []}
+        return jsonify({
+            "success": True,
+            "deleted": [row_id for row_id in ids if row_id in deleted],
+            "not_found": [row_id for row_id in ids if row_id not in deleted]
+        }), 200
+    except Exception as e:
+        current_app.logger.error(f"Error in batch delete route: {e}", exc_info=True)
+        return jsonify({"error": "Internal server error during batch deletion"}), 500
+
+
+@main_bp.route("/api/batch/restore", methods=["POST"])
+@require_active_session
+def batch_restore():
+    """
+    Restores several archived newsletters to draft status in one statement.
+    Rows that are not owned by the user or not archived are reported as not restored.
+    """
+    try:
+        user_id = request.current_user_id
+        try:
+            ids = parse_batch_ids()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        result = supabase.table(PROJECTS_TABLE) \
+            .update({"status": "DRAFT", "updated_at": datetime.utcnow().isoformat()}) \
+            .in_("id", ids) \
+            .eq("user_id", user_id) \
+            .eq("status", "ARCHIVED") \
+            .execute()
+        if hasattr(result, 'error') and result.error:
+            current_app.logger.error(f"Supabase batch restore error: {result.error}", exc_info=True)
+            return jsonify({"error": "Batch restore failed"}), 500
+
+        restored = {str(row['id']): row.get('project_name') for row in result.data or []}
+        return jsonify({
+            "success": True,
+            "restored": [{"id": row_id, "name": restored[row_id]} for row_id in ids if row_id in restored],
+            "not_restored": [row_id for row_id in ids if row_id not in restored]
+        }), 200
+    except Exception as e:
+        current_app.logger.error(f"Error in batch restore route: {e}", exc_info=True)
+        return jsonify({"error": "Internal server error during batch restore"}), 500
+
+
+@main_bp.route("/api/batch/duplicate", methods=["POST"])
+@require_active_session
+def batch_duplicate():
+    """
+    Duplicates several newsletters: one query for the originals, one for the names
+    they could conflict with, and a single bulk insert of the copies.
+    """
+    try:
+        user_id = request.current_user_id
+        try:
+            ids = parse_batch_ids()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        result = supabase.table(PROJECTS_TABLE) \
+            .select('id, project_name, json_path, image_path') \
+            .in_('id', ids) \
+            .eq('user_id', user_id) \
+            .execute()
+        if hasattr(result, 'error') and result.error:
+            current_app.logger.error(f"Supabase query error (batch duplicate): {result.error}", exc_info=True)
+            return jsonify({"error": "Database query failed"}), 500
+
+        originals = {str(row['id']): row for row in result.data or []}
+        found = [row_id for row_id in ids if row_id in originals]
+        not_found = [row_id for row_id in ids if row_id not in originals]
+        if not found:
+            return jsonify({"success": True, "duplicates": [], "not_found": not_found}), 200
+
+        new_names = get_unique_project_names([originals[row_id]["project_name"] for row_id in found], user_id)
+        timestamp = datetime.utcnow().isoformat()
+        insert_data = [{
+            "user_id": user_id,
+            "project_name": new_name,
+            "project_id": str(uuid.uuid4()),
+            "json_path": originals[row_id]["json_path"], # Versions are immutable, so copies share the stored files
+            "image_path": originals[row_id]["image_path"],
+            "status": "DRAFT",
+            "version": 1,
+            "created_at": timestamp,
+            "updated_at": timestamp
+        } for row_id, new_name in zip(found, new_names)]
+
+        insert_response = supabase.table(PROJECTS_TABLE).insert(insert_data).execute()
+        if hasattr(insert_response, 'error') and insert_response.error:
+            current_app.logger.error(f"Database insert for batch duplicate failed: {insert_response.error}", exc_info=True)
+            return jsonify({"error": f"Failed to create duplicate projects: {insert_response.error.get('message', 'Unknown database error')}"}), 500
+
+        source_ids = {row["project_id"]: row_id for row_id, row in zip(found, insert_data)}
+        return jsonify({
+            "success": True,
+            "duplicates": [
+                {"source_id": source_ids.get(row["project_id"]), "id": row.get("id"), "name": row["project_name"], "new_project_id": row["project_id"]}
+                for row in insert_response.data or []
+            ],
+            "not_found": not_found
+        }), 201
+    except Exception as e:
+        current_app.logger.error(f"Internal server error in batch duplicate route: {e}", exc_info=True)
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
+
 @main_bp.route("/api/preview/<string:id>")
 @require_active_session
 def preview(id):
@@ -644,21 +1311,7 @@ def preview(id):
 
         if result.data:
             row = result.data[0]
-            json_path = row.get("json_path")
-            
-            # Fetch JSON content from the public URL
-            response = requests.get(json_path)
-            if response.status_code != 200:
-                current_app.logger.error(f"Failed to fetch JSON from Supabase storage for ID {id}: Status {response.status_code}", exc_info=True)
-                return jsonify({"error": "Failed to fetch JSON from Supabase storage"}), 500
-            
-            try:
-                row["json_path"] = response.json() # Replace path with actual JSON content
-            except json.JSONDecodeError:
-                current_app.logger.error(f"Failed to decode JSON from {json_path}", exc_info=True)
-                return jsonify({"error": "Failed to decode project data"}), 500
-            
-            return jsonify(row), 200
+            return project_json_response(row)
         else:
              return jsonify({"error":"Could not find file or access denied"}), 404
     except Exception as e:
@@ -670,35 +1323,119 @@ def preview(id):
 @require_active_session
 def get_newsletter_versions(project_id):
     """
-    Fetches all versions of a specific newsletter identified by its project_id.
-    Versions are ordered from newest to oldest. Requires an active user session.
+    Fetches the versions of a specific newsletter identified by its project_id.
+    Versions are ordered from newest to oldest and keyset-paginated with ?limit=
+    and ?cursor= (next_cursor of the previous page); json_path is only included
+    with ?include=json_path. Requires an active user session.
     """
     try:
         user_id = request.current_user_id # Get user ID from decorator
-        
-        result = supabase.table(PROJECTS_TABLE) \
-            .select('id, project_id, project_name, status, version, created_at, updated_at, image_path, json_path') \
+
+        try:
+            limit = min(max(int(request.args.get("limit", DEFAULT_VERSIONS_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+            cursor = request.args.get("cursor")
+            if cursor:
+                # Both cursor fields end up in the PostgREST filter, so only accept their real types
+                version, row_id = decode_cursor(cursor)
+                cursor = int(version), str(uuid.UUID(row_id))
+        except (ValueError, TypeError) as e:
+            return jsonify({"error": f"Invalid pagination parameters: {e}"}), 400
+
+        columns = VERSION_COLUMNS + (", json_path" if request.args.get("include") == "json_path" else "")
+        query = supabase.table(PROJECTS_TABLE) \
+            .select(columns) \
             .eq('project_id', project_id) \
             .eq('user_id', user_id) \
             .order('version', desc=True) \
-            .execute()
+            .order('id', desc=True) \
+            .limit(limit + 1)
+        if cursor:
+            version, row_id = cursor
+            query = query.or_(f'version.lt.{version},and(version.eq.{version},id.lt."{row_id}")')
+        result = query.execute()
         
         if hasattr(result, 'error') and result.error:
             current_app.logger.error(f"Supabase query error for project_id {project_id}: {result.error}", exc_info=True)
             return jsonify({"error": f"Failed to fetch versions from database: {result.error.get('message', 'Unknown Supabase error')}"}), 500
 
         versions_data = result.data if result.data else []
+        next_cursor = encode_cursor(versions_data[limit - 1], sort_key="version") if len(versions_data) > limit else None
+        versions_data = versions_data[:limit]
+        for row in versions_data:
+            row["thumbnail_pending"] = is_thumbnail_pending(row)
 
         if not versions_data:
-            return jsonify({"success": True, "message": "No versions found for this project ID.", "versions": []}), 200
+            return jsonify({"success": True, "message": "No versions found for this project ID.", "versions": [], "next_cursor": None}), 200
         
-        return jsonify({"success": True, "message": "Newsletter versions fetched successfully.", "versions": versions_data}), 200
+        return jsonify({"success": True, "message": "Newsletter versions fetched successfully.", "versions": versions_data, "next_cursor": next_cursor}), 200
 
     except Exception as e:
         current_app.logger.error(f"Internal server error while fetching newsletter versions for project_id {project_id}: {e}", exc_info=True)
         return jsonify({"error": f"Internal server error: {str(e)}. Check server logs for details."}), 500
 
 
+@main_bp.route("/api/newsletters/<string:project_id>/diff", methods=["GET"])
+@require_active_session
+def get_newsletter_version_diff(project_id):
+    """
+    Structural diff between two versions of a newsletter (?from=<version>&to=<version>),
+    as JSON Patch operations turning the from version's project data into the to version's.
+    Versions are immutable, so results are cached per (from, to) pair.
+    Requires an active user session.
+    """
+    try:
+        user_id = request.current_user_id
+
+        try:
+            from_version = int(request.args["from"])
+            to_version = int(request.args["to"])
+        except (KeyError, ValueError):
+            return jsonify({"error": "Integer 'from' and 'to' versions are required"}), 400
+
+        result = supabase.table(PROJECTS_TABLE) \
+            .select('version, json_path') \
+            .eq('project_id', project_id) \
+            .eq('user_id', user_id) \
+            .in_('version', list({from_version, to_version})) \
+            .execute()
+        if hasattr(result, 'error') and result.error:
+            current_app.logger.error(f"Supabase query error (diff) for project_id {project_id}: {result.error}", exc_info=True)
+            return jsonify({"error": "Database query failed"}), 500
+
+        json_paths = {row["version"]: row["json_path"] for row in result.data or []}
+        if from_version not in json_paths or to_version not in json_paths:
+            return jsonify({"error": "Version not found or access denied"}), 404
+
+        cache_key = f"{json_paths[from_version]}\x1f{json_paths[to_version]}"
+        body = version_diffs.get(cache_key)
+        if body is None:
+            try:
+                old = json.loads(load_project_json(json_paths[from_version]))
+                new = json.loads(load_project_json(json_paths[to_version]))
+            except ProjectFetchError as e:
+                current_app.logger.error(f"Failed to load versions for diff: {e}", exc_info=True)
+                return jsonify({"error": "Failed to fetch JSON from Supabase storage"}), 500
+
+            operations = json_diff(old, new)
+            summary = {op: sum(1 for operation in operations if operation["op"] == op) for op in ("add", "remove", "replace")}
+            body = json.dumps({
+                "success": True,
+                "from": from_version,
+                "to": to_version,
+                "summary": summary,
+                "operations": operations
+            }, separators=(",", ":")).encode("utf-8")
+            version_diffs.put(cache_key, body)
+
+        response = Response(body, status=200, mimetype="application/json")
+        response.headers["Cache-Control"] = "private, max-age=86400"
+        return response
+
+    except Exception as e:
+        current_app.logger.error(f"Internal server error in version diff for project_id {project_id}: {e}", exc_info=True)
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
+
 
 # =============================================================================
 # REACT APP SERVING (Single catch-all route for all non-API requests)
@@ -724,82 +1461,69 @@ def serve_react_app(path):
 # =============================================================================
 # HELPER FUNCTIONS
 # =============================================================================
-def get_unique_project_name(desired_project_name: str, user_id: str, current_project_id: str = None) -> str:
+DUPLICATE_SUFFIX_PATTERN = re.compile(r"^(.*?)(?: \(Duplicate(?: (\d+))?\))?$")
+
+
+def _ilike_prefix_filter(prefix):
+    # Quoted PostgREST value, so names with commas or parentheses do not break the or=() filter
+    escaped = prefix.replace("\\", "\\\\").replace('"', '\\"')
+    return f'project_name.ilike."{escaped}*"'
+
+
+def get_unique_project_names(desired_project_names, user_id: str, current_project_id: str = None) -> list:
     """
-    Suggests a unique project name by appending (Duplicate N) if a conflict exists.
-    
+    Suggests unique project names by appending (Duplicate N) where a name conflicts.
+
+    Every possibly conflicting name is fetched in one query and suffixes are allocated
+    in memory, so names suggested earlier in the list count as taken for later ones.
+
     Args:
-        desired_project_name: The initial name proposed by the user.
-        user_id: The ID of the user creating/updating the project.
+        desired_project_names: The initial names proposed for the new projects.
+        user_id: The ID of the user creating/updating the projects.
         current_project_id: Optional. The project_id if updating an existing project.
                             This allows the current project's name to be ignored as a conflict.
     Returns:
-        A unique project name.
+        A list of unique project names, in the order of desired_project_names.
     """
-    # Step 1: Determine the base name without any existing (Duplicate X) suffix
-    base_name_match = re.match(r"^(.*?)(?: \(Duplicate(?: (\d+))?\))?$", desired_project_name)
-    if base_name_match:
-        base_name = base_name_match.group(1).strip()
-    else:
-        base_name = desired_project_name
+    # Base names without any existing (Duplicate X) suffix
+    base_names = [DUPLICATE_SUFFIX_PATTERN.match(name).group(1).strip() for name in desired_project_names]
 
-    # Step 2: Query for existing projects by this user that might conflict
-    # Using 'ilike' for case-insensitive matching if your DB supports it,
-    # otherwise use 'like' or adjust as needed.
+    # Case-insensitive prefix match on every base name, in a single query
     existing_projects_query = supabase.table(PROJECTS_TABLE)\
         .select('project_name', 'project_id')\
-        .ilike('project_name', f"{base_name}%")\
         .eq('user_id', user_id)\
+        .or_(",".join(_ilike_prefix_filter(base) for base in dict.fromkeys(base_names)))\
         .execute()
-    
-    existing_names_by_user = []
-    if existing_projects_query.data:
-        for p in existing_projects_query.data:
-            # Exclude the current project_id's name if we are updating it.
-            # This prevents a project from conflicting with its own existing name.
-            if current_project_id and p.get('project_id') == current_project_id:
-                continue
-            existing_names_by_user.append(p['project_name'])
-
-    suggested_name = desired_project_name # Start with the desired name
-    
-    # Check if the desired_project_name itself already exists exactly among *other* projects
-    if desired_project_name in existing_names_by_user:
-        is_conflict_found = True
-    else:
-        is_conflict_found = False
 
-    if is_conflict_found:
-        highest_num = 0
-        duplicate_pattern_with_num = re.compile(r" \(Duplicate (\d+)\)$")
-        # Ensure the pattern for " (Duplicate)" without a number is also handled
-        duplicate_pattern_no_num = re.compile(r" \(Duplicate\)$") 
+    taken = set()
+    for p in existing_projects_query.data or []:
+        # Exclude the current project_id's name if we are updating it.
+        # This prevents a project from conflicting with its own existing name.
+        if current_project_id and p.get('project_id') == current_project_id:
+            continue
+        taken.add(p['project_name'])
 
-        # Iterate through existing names to find the highest duplicate number
-        for name in existing_names_by_user:
-            match_with_num = duplicate_pattern_with_num.search(name)
-            match_no_num = duplicate_pattern_no_num.search(name)
+    suggested_names = []
+    for desired_project_name, base_name in zip(desired_project_names, base_names):
+        suggested_name = desired_project_name
+        if suggested_name in taken:
+            # Next number after the highest existing duplicate; " (Duplicate)" counts as 1
+            highest_num = 0
+            for name in taken:
+                match = DUPLICATE_SUFFIX_PATTERN.match(name)
+                if name != base_name and match.group(1).strip() == base_name:
+                    highest_num = max(highest_num, int(match.group(2) or 1))
+            suggested_name = f"{base_name} (Duplicate {highest_num + 1})"
 
-            if match_with_num:
-                try:
-                    num = int(match_with_num.group(1))
-                    if num > highest_num:
-                        highest_num = num
-                except ValueError:
-                    continue # Skip if number part is not an int
-            elif match_no_num:
-                # If " (Duplicate)" exists without a number, treat it as highest_num = 1
-                # unless a higher numbered duplicate is found.
-                if highest_num == 0:
-                    highest_num = 1
-        
-        # Suggest the next available duplicate number
-        new_duplicate_num = highest_num + 1
-        suggested_name = f"{base_name} (Duplicate {new_duplicate_num})"
-        
-        # Recursively check if the newly suggested name also conflicts
-        # This handles cases where "My Project (Duplicate 1)" and "My Project (Duplicate 2)" exist,
-        # and we need to suggest "My Project (Duplicate 3)".
-        return get_unique_project_name(suggested_name, user_id, current_project_id)
-    
-    return suggested_name
\ No newline at end of file
+        taken.add(suggested_name)
+        suggested_names.append(suggested_name)
+
+    return suggested_names
+
+
+def get_unique_project_name(desired_project_name: str, user_id: str, current_project_id: str = None) -> str:
+    """
+    Suggests a unique project name by appending (Duplicate N) if a conflict exists.
+    See get_unique_project_names.
+    """
+    return get_unique_project_names([desired_project_name], user_id, current_project_id)[0]
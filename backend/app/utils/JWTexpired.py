@@ -1,9 +1,24 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import threading
 import time
+from collections import OrderedDict
 from functools import wraps
+from inspect import iscoroutinefunction
 from flask import jsonify, request, current_app
 from supabase import create_client, Client
 from gotrue.errors import AuthApiError # Make sure this is imported if you're using it to catch specific errors
-from app.config import SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY
+from app.config import (
+    SUPABASE_URL,
+    SUPABASE_SERVICE_ROLE_KEY,
+    JWT_SECRET_KEY,
+    JWT_CACHE_TTL,
+    JWT_CACHE_MAX_ENTRIES,
+    JWT_LEEWAY
+)
 
 # Initialize a *separate* Supabase client for admin operations in this module.
 # This client uses the SERVICE_ROLE_KEY and is able to verify tokens.
@@ -14,56 +29,226 @@ except Exception as e:
     # In a real app, you might want to raise an exception or exit if the client cannot be initialized
     # For now, logging the error is sufficient.
 
-# Wrapper for checking if user is logged in and token is valid
-def require_active_session(func):
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        auth_header = request.headers.get('Authorization')
+class InvalidTokenError(Exception):
+    pass
 
-        if not auth_header:
-            return jsonify({"error": "Authorization token is missing"}), 401
 
-        try:
-            token_type, access_token = auth_header.split(None, 1)
-            if token_type.lower() != 'bearer':
-                return jsonify({"error": "Unsupported authorization type"}), 401
-        except ValueError:
-            return jsonify({"error": "Invalid Authorization header format"}), 401
+def _b64url_decode(segment):
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def verify_jwt_locally(access_token):
+    """
+    Verifies an HS256 Supabase access token with JWT_SECRET_KEY, without a network call.
+
+    Returns:
+        dict: the token claims, or None if the token cannot be checked locally
+              (no secret configured or a non-HS256 signing key)
+    Raises:
+        InvalidTokenError: bad signature, expired token or wrong audience
+    """
+    if not JWT_SECRET_KEY:
+        return None
+
+    try:
+        header_segment, payload_segment, signature_segment = access_token.split(".")
+        header = json.loads(_b64url_decode(header_segment))
+        if not isinstance(header, dict):
+            raise InvalidTokenError("Malformed token")
+        if header.get("alg") != "HS256":
+            return None
+
+        expected = hmac.new(JWT_SECRET_KEY.encode("utf-8"), f"{header_segment}.{payload_segment}".encode("ascii"), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64url_decode(signature_segment)):
+            raise InvalidTokenError("Invalid token signature")
+
+        claims = json.loads(_b64url_decode(payload_segment))
+    except (ValueError, UnicodeError) as e:
+        raise InvalidTokenError("Malformed token") from e
+    if not isinstance(claims, dict):
+        raise InvalidTokenError("Malformed token")
+
+    for claim in ("exp", "nbf"):
+        if claim in claims and (not isinstance(claims[claim], (int, float)) or isinstance(claims[claim], bool)):
+            raise InvalidTokenError("Malformed token")
+
+    now = time.time()
+    if "exp" not in claims or claims["exp"] + JWT_LEEWAY < now:
+        raise InvalidTokenError("Token has expired. Please log in again.")
+    if claims.get("nbf") and claims["nbf"] - JWT_LEEWAY > now:
+        raise InvalidTokenError("Token is not valid yet")
+    audience = claims.get("aud")
+    if audience != "authenticated" and not (isinstance(audience, list) and "authenticated" in audience):
+        raise InvalidTokenError("Invalid token audience")
+    if not claims.get("sub"):
+        raise InvalidTokenError("Token has no subject")
+
+    return claims
+
+
+def token_expiry(access_token):
+    """
+    Reads the exp claim of a token without checking its signature.
+    Only for tokens Supabase Auth has already verified. Returns None if it cannot be read.
+    """
+    try:
+        exp = json.loads(_b64url_decode(access_token.split(".")[1])).get("exp")
+    except (ValueError, UnicodeError, IndexError, AttributeError):
+        return None
+    return exp if isinstance(exp, (int, float)) and not isinstance(exp, bool) else None
+
+
+class VerifiedTokenCache:
+    """Short-lived cache of already verified tokens; an entry never outlives its token."""
+
+    def __init__(self, ttl=JWT_CACHE_TTL, max_entries=JWT_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # sha256(token) -> (user_id, valid_until)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(access_token):
+        return hashlib.sha256(access_token.encode("utf-8")).hexdigest()
+
+    def get(self, access_token):
+        key = self._key(access_token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            if entry[1] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, access_token, user_id, token_exp=None):
+        valid_until = time.time() + self.ttl
+        if token_exp:
+            valid_until = min(valid_until, token_exp)
+        with self._lock:
+            self._entries[self._key(access_token)] = (user_id, valid_until)
+            self._entries.move_to_end(self._key(access_token))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
 
-        if not access_token:
-            return jsonify({"error": "Access token is missing"}), 401
+verified_tokens = VerifiedTokenCache()
+
+
+def _check_session_locally(verify_remote):
+    """
+    Reads the bearer token and tries the verified-token cache and local verification.
+    Returns (access_token, user_id, error response); with neither a user_id nor an
+    error, Supabase Auth has to be asked (_check_session_remotely).
+    """
+    auth_header = request.headers.get('Authorization')
+
+    if not auth_header:
+        return None, None, (jsonify({"error": "Authorization token is missing"}), 401)
+
+    try:
+        token_type, access_token = auth_header.split(None, 1)
+        if token_type.lower() != 'bearer':
+            return None, None, (jsonify({"error": "Unsupported authorization type"}), 401)
+    except ValueError:
+        return None, None, (jsonify({"error": "Invalid Authorization header format"}), 401)
+
+    if not access_token:
+        return None, None, (jsonify({"error": "Access token is missing"}), 401)
+
+    if not verify_remote:
+        cached_user_id = verified_tokens.get(access_token)
+        if cached_user_id:
+            return access_token, cached_user_id, None
 
         try:
-            # CORRECTED LOGIC HERE:
-            # Use supabase_admin_client.auth.get_user(jwt=access_token)
-            # This method directly verifies the JWT using the service role key.
-            user_response = supabase_admin_client.auth.get_user(jwt=access_token)
-
-            # The get_user(jwt=...) method returns a GoTrueUserResponse.
-            # It will either raise AuthApiError for truly invalid/expired tokens,
-            # or return a UserResponse object. We check for user_response.user
-            # to see if a valid user was found.
-
-            # We DO NOT check `user_response.error` directly as UserResponse objects
-            # do not have this attribute. AuthApiError is raised for explicit errors.
-
-            if user_response and user_response.user:
-                # If a valid user object is found, proceed
-                request.current_user_id = user_response.user.id
-                return func(*args, **kwargs)
-            else:
-                # This means the token was processed by get_user, but no valid user was linked.
-                # This could happen if the user was deleted after the token was issued, etc.
-                current_app.logger.warning(f"No user object found in response for token: {access_token[:20]}...")
-                return jsonify({"error": "No user found for the provided token. Please log in again."}), 401
-            
-        except AuthApiError as e:
-            # This block catches errors specifically raised by GoTrue (like token expired, invalid signature).
-            current_app.logger.warning(f"AuthApiError during token verification: {e.message}")
-            return jsonify({"error": e.message or "Invalid or expired token. Please log in again."}), 401
-        except Exception as e:
-            # Catch broader unexpected exceptions during the process.
-            current_app.logger.error(f"Unexpected error during token verification: {e}", exc_info=True)
-            return jsonify({"error": "Internal server error during authentication"}), 500
+            claims = verify_jwt_locally(access_token)
+        except InvalidTokenError as e:
+            current_app.logger.warning(f"Local token verification failed: {e}")
+            return access_token, None, (jsonify({"error": str(e) or "Invalid or expired token. Please log in again."}), 401)
+
+        if claims:
+            verified_tokens.put(access_token, claims["sub"], claims["exp"])
+            return access_token, claims["sub"], None
+
+    return access_token, None, None
+
+
+def _check_session_remotely(access_token):
+    """Verifies a token with Supabase Auth (a network call). Returns (user_id, error response)."""
+    try:
+        # CORRECTED LOGIC HERE:
+        # Use supabase_admin_client.auth.get_user(jwt=access_token)
+        # This method directly verifies the JWT using the service role key.
+        user_response = supabase_admin_client.auth.get_user(jwt=access_token)
+
+        # The get_user(jwt=...) method returns a GoTrueUserResponse.
+        # It will either raise AuthApiError for truly invalid/expired tokens,
+        # or return a UserResponse object. We check for user_response.user
+        # to see if a valid user was found.
+
+        # We DO NOT check `user_response.error` directly as UserResponse objects
+        # do not have this attribute. AuthApiError is raised for explicit errors.
+
+        if user_response and user_response.user:
+            # If a valid user object is found, proceed; the cache entry must not outlive the token
+            token_exp = token_expiry(access_token)
+            if token_exp:
+                verified_tokens.put(access_token, user_response.user.id, token_exp)
+            return user_response.user.id, None
+        else:
+            # This means the token was processed by get_user, but no valid user was linked.
+            # This could happen if the user was deleted after the token was issued, etc.
+            current_app.logger.warning(f"No user object found in response for token: {access_token[:20]}...")
+            return None, (jsonify({"error": "No user found for the provided token. Please log in again."}), 401)
+
+    except AuthApiError as e:
+        # This block catches errors specifically raised by GoTrue (like token expired, invalid signature).
+        current_app.logger.warning(f"AuthApiError during token verification: {e.message}")
+        return None, (jsonify({"error": e.message or "Invalid or expired token. Please log in again."}), 401)
+    except Exception as e:
+        # Catch broader unexpected exceptions during the process.
+        current_app.logger.error(f"Unexpected error during token verification: {e}", exc_info=True)
+        return None, (jsonify({"error": "Internal server error during authentication"}), 500)
+
+
+# Wrapper for checking if user is logged in and token is valid.
+# Tokens are verified locally (signature + expiry) and cached briefly. Routes where a
+# revoked session must be rejected right away use @require_active_session(verify_remote=True),
+# which always asks Supabase Auth.
+# Async views get an async wrapper, so they stay coroutines (served natively by asgi.py)
+# and the Supabase Auth call runs in a worker thread instead of blocking the event loop.
+def require_active_session(func=None, *, verify_remote=False):
+    if func is None:
+        return lambda f: require_active_session(f, verify_remote=verify_remote)
+
+    if iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            access_token, user_id, error = _check_session_locally(verify_remote)
+            if error:
+                return error
+            if not user_id:
+                user_id, error = await asyncio.to_thread(_check_session_remotely, access_token)
+                if error:
+                    return error
+            request.current_user_id = user_id
+            return await func(*args, **kwargs)
+
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        access_token, user_id, error = _check_session_locally(verify_remote)
+        if error:
+            return error
+        if not user_id:
+            user_id, error = _check_session_remotely(access_token)
+            if error:
+                return error
+        request.current_user_id = user_id
+        return func(*args, **kwargs)
 
     return wrapper
\ No newline at end of file
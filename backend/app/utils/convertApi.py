@@ -1,42 +1,98 @@
-import base64
-import requests
+import hashlib
 import os
-from app.config import CONVERT_API_SECRET,INPUT_PATH
-
-
-
-def convert_pdf_to_html(file):
-    file_content = base64.b64encode(file.read()).decode("utf-8")
-    
-    payload = {
-        "Parameters": [
-            {
-                "Name": "File",
-                "FileValue": {
-                    "Name": file.filename,
-                    "Data": file_content
-                }
-            },
-            {
-                "Name": "StoreFile",
-                "Value": True
-            }
-        ]
-    }
-
+import shutil
+import tempfile
+from werkzeug.utils import secure_filename
+from app.config import CONVERT_API_SECRET,INPUT_PATH,CONVERT_CACHE_PATH,CONVERT_CACHE_MAX_BYTES
+from app.utils.diskCache import DiskLRUCache
+from app.utils import httpClient
+
+# PDF->HTML conversions keyed by the SHA-256 of the PDF bytes
+conversion_cache = DiskLRUCache(CONVERT_CACHE_PATH, CONVERT_CACHE_MAX_BYTES, suffix=".html")
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def _spool_upload(file, spool_dir):
+    """
+    Copies an uploaded file to disk chunk by chunk, hashing it on the way.
+    Returns (spool_path, sha256 hexdigest).
+    """
+    digest = hashlib.sha256()
+    fd, spool_path = tempfile.mkstemp(dir=spool_dir, prefix=".upload-", suffix=".pdf")
+    with os.fdopen(fd, "wb") as spool:
+        while True:
+            chunk = file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            spool.write(chunk)
+    return spool_path, digest.hexdigest()
+
+
+def _convert_file(url, file_path, filename, params):
+    """
+    Uploads a file to ConvertAPI as an octet-stream body, streamed straight from disk.
+    Returns the requests response of the conversion call.
+    """
     headers = {
         "Authorization": f"Bearer {CONVERT_API_SECRET}",
-        "Content-type": "application/json"
+        "Content-Type": "application/octet-stream",
+        "Content-Disposition": f'inline; filename="{filename}"'
     }
-
-    response = requests.post("https://v2.convertapi.com/convert/pdf/to/html", json=payload, headers=headers)
+    with open(file_path, "rb") as f:
+        return httpClient.post(url, data=f, params={"StoreFile": "true", **params}, headers=headers, timeout=httpClient.LONG_TIMEOUT)
+
+
+def _download_to(url, output_path):
+    """Streams a converted file to disk in chunks. Returns the response for error reporting."""
+    with httpClient.get(url, stream=True, timeout=httpClient.LONG_TIMEOUT) as response:
+        if response.status_code != 200:
+            response.content  # read the (small) error body before the connection is released
+            return response
+        with open(output_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                f.write(chunk)
+        return response
+
+
+def convert_pdf_to_html(file, output_dir=INPUT_PATH):
+    output_file = f"{output_dir}/converted_output.html"
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Spool the upload to disk so memory use does not grow with the PDF size
+    spool_path, cache_key = _spool_upload(file, output_dir)
+
+    try:
+        # Same PDF uploaded before: skip ConvertAPI entirely
+        cached_path = conversion_cache.path_for(cache_key)
+        if cached_path is not None:
+            try:
+                shutil.copyfile(cached_path, output_file)
+                return True, None
+            except FileNotFoundError:
+                pass  # evicted by another worker in the meantime, convert again
+
+        response = _convert_file(
+            "https://v2.convertapi.com/convert/pdf/to/html",
+            spool_path,
+            secure_filename(file.filename or "") or "upload.pdf",
+            {}
+        )
+    finally:
+        os.remove(spool_path)
 
     if response.status_code == 200:
         download_url = response.json()["Files"][0]["Url"]
-        html_response = requests.get(download_url)
+        html_response = _download_to(download_url, output_file)
 
-        with open(f"{INPUT_PATH}/converted_output.html", "wb") as f:
-            f.write(html_response.content)
+        if html_response.status_code != 200:
+            return False, f"{html_response.status_code}\n{html_response.text}"
+
+        fd, cache_tmp = tempfile.mkstemp(dir=conversion_cache.directory, prefix=".tmp-")
+        os.close(fd)
+        shutil.copyfile(output_file, cache_tmp)
+        conversion_cache.put_file(cache_key, cache_tmp)
 
         return True, None
     else:
@@ -44,56 +100,28 @@ def convert_pdf_to_html(file):
 
 
 def convert_html_to_pdf(file_path, output_dir='uploads/converted_pdfs'):
-    # Read the HTML file and encode it in base64
-    with open(file_path, 'rb') as f:
-        file_data = f.read()
-        base64_file = base64.b64encode(file_data).decode('utf-8')
-
-    # Set up the API request
-    url = "https://v2.convertapi.com/convert/htm/to/pdf"
-    headers = {
-        "Authorization": f"Bearer {CONVERT_API_SECRET}",  # Replace with your actual token
-        "Content-Type": "application/json"
-    }
-
-    # Prepare the parameters for the ConvertAPI request
-    payload = {
-        "Parameters": [
-            {
-                "Name": "File",
-                "FileValue": {
-                    "Name": os.path.basename(file_path),
-                    "Data": base64_file
-                }
-            },
-            {
-                "Name": "StoreFile",
-                "Value": True
-            },
-            {
-                "Name":"PageSize",
-                "Value":"A4"
-            }
-        ]
-    }
-
-    # Send the request to ConvertAPI
-    response = requests.post(url, json=payload, headers=headers)
+    # Send the HTML file to ConvertAPI, streamed from disk
+    response = _convert_file(
+        "https://v2.convertapi.com/convert/htm/to/pdf",
+        file_path,
+        secure_filename(os.path.basename(file_path)) or "upload.html",
+        {"PageSize": "A4"}
+    )
 
     if response.status_code == 200:
         data = response.json()
         # Extract the URL of the generated PDF
         pdf_url = data["Files"][0]["Url"]
-        pdf_data = requests.get(pdf_url).content
 
         # Create the output directory if it doesn't exist
         os.makedirs(output_dir, exist_ok=True)
 
-        # Save the PDF to a file locally
+        # Stream the PDF to a file locally
         output_file_path = os.path.join(output_dir, f"{os.path.splitext(os.path.basename(file_path))[0]}.pdf")
-        with open(output_file_path, 'wb') as pdf_file:
-            pdf_file.write(pdf_data)
+        pdf_response = _download_to(pdf_url, output_file_path)
+        if pdf_response.status_code != 200:
+            raise Exception(f"Failed to download converted PDF: {pdf_response.status_code}")
 
         return output_file_path
     else:
-        raise Exception(f"Failed to convert HTML to PDF: {response.text}")
\ No newline at end of file
+        raise Exception(f"Failed to convert HTML to PDF: {response.text}")
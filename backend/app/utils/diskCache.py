@@ -0,0 +1,118 @@
+import os
+import tempfile
+import threading
+
+
+class DiskLRUCache:
+    """
+    Size-bounded cache of immutable blobs on local disk.
+
+    Entries are plain files named after their key, so several worker processes can
+    share one directory. Recency is tracked through the file mtime (touched on every
+    hit) and the least recently used files are evicted once max_bytes is exceeded.
+    """
+
+    def __init__(self, directory, max_bytes, suffix=""):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        os.makedirs(directory, exist_ok=True)
+        self._size = self._scan_size()
+
+    def _path(self, key):
+        if not key or "/" in key or "\\" in key or key.startswith("."):
+            raise ValueError(f"Invalid cache key: {key!r}")
+        return os.path.join(self.directory, f"{key}{self.suffix}")
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _scan_size(self):
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.startswith("."):
+                total += entry.stat().st_size
+        return total
+
+    def path_for(self, key):
+        """Returns the path of a cached entry (refreshing its recency), or None on a miss."""
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return path
+
+    def get(self, key):
+        """Returns the cached bytes, or None on a miss."""
+        path = self.path_for(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            # Evicted by another worker between the check and the read
+            return None
+
+    def put(self, key, data):
+        """Stores bytes under key. Returns the path of the stored entry."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return self.put_file(key, tmp_path)
+
+    def put_file(self, key, source_path):
+        """Moves an existing file on the same filesystem into the cache under key."""
+        path = self._path(key)
+        size = os.path.getsize(source_path)
+        os.replace(source_path, path)
+
+        with self._lock:
+            self._stats["stores"] += 1
+            self._size += size
+            over_budget = self._size > self.max_bytes
+
+        if over_budget:
+            self._evict()
+        return path
+
+    def _evict(self):
+        # Rescan so entries written by other workers are accounted for too
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.startswith("."):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+
+        with self._lock:
+            self._size = total
+            self._stats["evictions"] += evicted
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else None,
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes
+            }
@@ -0,0 +1,66 @@
+import asyncio
+import os
+import threading
+
+
+class WorkerLoop:
+    """
+    The one asyncio event loop of a worker process.
+
+    Under the ASGI entry point (asgi.py) this is the server's own loop, attached at
+    startup. Under a plain WSGI server the loop is started on a daemon thread on
+    first use. Request threads hand coroutines to it with run() and wait for the
+    result, so async views and every async client (LLM, Supabase, httpx) share one
+    loop and one set of connection pools per worker, instead of a fresh loop per
+    request. The caller's context variables (Flask request/app context) are carried
+    over to the coroutine.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def attach(self, loop):
+        """Uses an already running loop (the ASGI server's) as the worker loop."""
+        with self._lock:
+            self._loop, self._thread, self._pid = loop, None, os.getpid()
+
+    @property
+    def loop(self):
+        """The current worker loop, or None before first use."""
+        return self._loop
+
+    def get_loop(self):
+        with self._lock:
+            # A forked worker must not reuse the parent's loop (its thread does not exist here)
+            if self._loop is None or self._pid != os.getpid() or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="worker-loop", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+            return self._loop
+
+    def run(self, coro, timeout=None):
+        """Runs a coroutine on the worker loop from a synchronous caller and returns its result."""
+        loop = self.get_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            coro.close()
+            raise RuntimeError("WorkerLoop.run() called from the worker loop itself; await the coroutine instead")
+
+        # run_coroutine_threadsafe schedules through call_soon_threadsafe, which copies the
+        # calling thread's contextvars, so the request context is visible inside the task
+        return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+
+worker_loop = WorkerLoop()
+
+
+def run_async(coro, timeout=None):
+    """Runs a coroutine on this worker's shared event loop and waits for it (see WorkerLoop)."""
+    return worker_loop.run(coro, timeout)
@@ -1,36 +1,191 @@
 import asyncio
+import atexit
+import concurrent.futures
+import threading
 from playwright.async_api import async_playwright
-from io import BytesIO
+from app.config import (
+    THUMBNAIL_POOL_SIZE,
+    THUMBNAIL_RECYCLE_AFTER,
+    THUMBNAIL_RENDER_TIMEOUT
+)
 
 
-async def html_to_png_bytes(html_content: str, width: int = 1200, height: int = 800) -> bytes:
+class BrowserPool:
     """
-    Convert HTML content to PNG bytes using Playwright
-    
-    Args:
-        html_content: String containing HTML to render
-        width: Viewport width in pixels
-        height: Viewport height in pixels
-    
-    Returns:
-        bytes: PNG image data
+    Long-lived Chromium instance with a fixed number of warm pages.
+
+    Playwright objects are bound to the event loop that created them, so the pool
+    owns a dedicated loop running on a daemon thread. Callers on any thread (Flask
+    workers, asyncio.run in a route, ...) hand their render to that loop and wait.
     """
-    async with async_playwright() as p:
-        browser = await p.chromium.launch()
-        page = await browser.new_page()
-        
+
+    def __init__(self, size=THUMBNAIL_POOL_SIZE, recycle_after=THUMBNAIL_RECYCLE_AFTER):
+        self.size = max(1, size)
+        self.recycle_after = max(1, recycle_after)
+        self._loop = None
+        self._thread = None
+        self._playwright = None
+        self._browser = None
+        self._pages = None
+        self._generation = 0  # bumped whenever Chromium is replaced; older pages are dropped
+        self._renders = {}  # page -> number of renders done on its context
+        self._start_lock = threading.Lock()
+        self._browser_lock = None
+
+    # ------------------------------------------------------------------ lifecycle
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name="thumbnail-pool", daemon=True)
+            self._thread.start()
+
+    async def _ensure_browser(self):
+        if self._browser_lock is None:
+            self._browser_lock = asyncio.Lock()
+
+        async with self._browser_lock:
+            # Health check: a crashed or disconnected Chromium gets replaced
+            if self._browser and self._browser.is_connected():
+                return
+
+            # The old pages are dropped and the generation bumped before anything is awaited,
+            # so no render picks up or returns a page of the browser being replaced. The queue
+            # itself is kept, so renders already waiting for a page are woken by the new pages.
+            if self._pages is None:
+                self._pages = asyncio.Queue()
+            while not self._pages.empty():
+                self._pages.get_nowait()
+            self._generation += 1
+
+            await self._close_browser()
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch()
+            self._renders = {}
+            for _ in range(self.size):
+                await self._pages.put(await self._new_page())
+
+    async def _new_page(self):
+        context = await self._browser.new_context()
+        page = await context.new_page()
+        self._renders[page] = 0
+        return page
+
+    async def _recycle_page(self, page):
+        self._renders.pop(page, None)
         try:
-            # Configure viewport and content
+            await page.context.close()
+        except Exception:
+            pass
+        return await self._new_page()
+
+    async def _close_browser(self):
+        if self._browser:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+        self._browser = None
+
+    async def _shutdown(self):
+        await self._close_browser()
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def shutdown(self):
+        """Closes Chromium and stops the pool thread. Safe to call more than once."""
+        if not (self._thread and self._thread.is_alive()):
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=10)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+    # ------------------------------------------------------------------ rendering
+
+    async def _render(self, html_content, width, height):
+        await self._ensure_browser()
+        page = await self._pages.get()
+        generation = self._generation
+
+        try:
+            if page.is_closed():
+                page = await self._recycle_page(page)
+
             await page.set_viewport_size({"width": width, "height": height})
             await page.set_content(html_content)
-            
+
             # Wait for potential dynamic content
             await page.wait_for_load_state("networkidle")
-            
-            # Capture screenshot as bytes
+
             screenshot_bytes = await page.screenshot(type="png") #optional full_page=true
-            
+            self._renders[page] = self._renders.get(page, 0) + 1
             return screenshot_bytes
-            
+
+        except (Exception, asyncio.CancelledError):
+            # A page that failed or timed out mid-render is not trusted for the next save
+            self._renders[page] = self.recycle_after
+            # _browser is None while another render is relaunching Chromium
+            browser = self._browser
+            if browser is None or not browser.is_connected():
+                await self._ensure_browser()
+                page = None
+            raise
+
         finally:
-            await browser.close()
\ No newline at end of file
+            if page is not None and generation == self._generation:
+                if self._renders.get(page, 0) >= self.recycle_after:
+                    page = await self._recycle_page(page)
+                await self._pages.put(page)
+
+    def render(self, html_content, width=1200, height=800):
+        """Blocking render used from synchronous code (e.g. Flask routes)."""
+        self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self._render(html_content, width, height), self._loop)
+        try:
+            return future.result(timeout=THUMBNAIL_RENDER_TIMEOUT)
+        except concurrent.futures.TimeoutError:
+            # Stop the render so its page goes back to the pool instead of staying busy
+            future.cancel()
+            raise
+
+    async def render_async(self, html_content, width=1200, height=800):
+        """Awaitable render usable from any event loop."""
+        self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self._render(html_content, width, height), self._loop)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), THUMBNAIL_RENDER_TIMEOUT)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            future.cancel()
+            raise
+
+
+# One pool per worker process
+browser_pool = BrowserPool()
+atexit.register(browser_pool.shutdown)
+
+
+async def html_to_png_bytes(html_content: str, width: int = 1200, height: int = 800) -> bytes:
+    """
+    Convert HTML content to PNG bytes using the shared Playwright browser pool
+
+    Args:
+        html_content: String containing HTML to render
+        width: Viewport width in pixels
+        height: Viewport height in pixels
+
+    Returns:
+        bytes: PNG image data
+    """
+    return await browser_pool.render_async(html_content, width, height)
+
+
+def html_to_png_bytes_sync(html_content: str, width: int = 1200, height: int = 800) -> bytes:
+    """Synchronous variant of html_to_png_bytes, no event loop needed by the caller."""
+    return browser_pool.render(html_content, width, height)
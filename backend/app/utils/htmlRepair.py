@@ -0,0 +1,140 @@
+import re
+from html.parser import HTMLParser
+
+# Elements that never take a closing tag
+VOID_ELEMENTS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr"
+}
+
+# Elements whose closing tag browsers infer, so leaving them open is not a fault
+OPTIONAL_CLOSE = {"li", "p", "td", "th", "tr", "option", "dt", "dd", "thead", "tbody", "tfoot"}
+
+_FENCE_PATTERN = re.compile(r"^\s*```[a-zA-Z]*\s*$", re.MULTILINE)
+_WRAPPER_TAG_PATTERN = re.compile(r"</?(?:html|head|body)\b[^>]*>|<!doctype[^>]*>", re.IGNORECASE)
+# Real wrapper tags only; \b keeps <header> from counting as <head>
+_DOCUMENT_TAG_PATTERN = re.compile(r"<(?:html|head|body)\b", re.IGNORECASE)
+_HEAD_PATTERN = re.compile(r"<head\b[^>]*>(.*?)</head\s*>", re.IGNORECASE | re.DOTALL)
+_HEAD_NOISE_PATTERN = re.compile(r"<(?:meta|title|link)\b[^>]*>(?:.*?</title\s*>)?", re.IGNORECASE | re.DOTALL)
+_STYLE_OPEN_PATTERN = re.compile(r"<style\b[^>]*>", re.IGNORECASE)
+_STYLE_CLOSE_PATTERN = re.compile(r"</style\s*>", re.IGNORECASE)
+_CSS_RULE_START_PATTERN = re.compile(r"^[ \t]*[@.#:*a-zA-Z][^{}<\n]*\{", re.MULTILINE)
+
+
+class _TagBalance(HTMLParser):
+    """Tracks which elements are still open at the end of the document."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in VOID_ELEMENTS:
+            self.stack.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        pass
+
+    def handle_endtag(self, tag):
+        if tag in VOID_ELEMENTS:
+            return
+        if tag in self.stack:
+            # Implicitly close anything opened after the matching tag
+            while self.stack:
+                if self.stack.pop() == tag:
+                    break
+
+
+def _unclosed_tags(html):
+    parser = _TagBalance()
+    parser.feed(html)
+    parser.close()
+    return [tag for tag in parser.stack if tag not in OPTIONAL_CLOSE]
+
+
+def validate_html(html):
+    """
+    Structural check of a generated template.
+    Returns a list of problems, empty when the template is usable.
+    """
+    problems = []
+
+    if "```" in html:
+        problems.append("markdown fence left in output")
+
+    opens = len(_STYLE_OPEN_PATTERN.findall(html))
+    closes = len(_STYLE_CLOSE_PATTERN.findall(html))
+    if opens == 0:
+        problems.append("missing <style> block")
+    elif opens != closes:
+        problems.append("unterminated <style> block")
+
+    without_style = re.sub(r"<style\b.*?</style\s*>", "", html, flags=re.IGNORECASE | re.DOTALL)
+    if not re.search(r"<[a-z][^>]*>", without_style, re.IGNORECASE):
+        problems.append("no markup outside the <style> block")
+
+    if _DOCUMENT_TAG_PATTERN.search(html):
+        problems.append("document wrapper tags present")
+
+    unclosed = _unclosed_tags(html)
+    if unclosed:
+        problems.append(f"unclosed tags: {', '.join(unclosed)}")
+
+    return problems
+
+
+def repair_html(html):
+    """
+    Fixes common generation faults locally, without another model call.
+
+    Returns:
+        tuple: (repaired_html, list of applied fixes)
+    """
+    fixes = []
+
+    # Leftover markdown fences, anywhere in the output
+    if "```" in html:
+        html = _FENCE_PATTERN.sub("", html).replace("```html", "").replace("```", "")
+        fixes.append("removed markdown fences")
+
+    # Prose before the first tag / after the last one ("Here is your template: ...")
+    first, last = html.find("<"), html.rfind(">")
+    prefix = html[:first] if first != -1 else html
+    bare_css = _CSS_RULE_START_PATTERN.search(prefix)
+    if bare_css and "}" in prefix[bare_css.start():] and not _STYLE_OPEN_PATTERN.search(html):
+        # CSS rules emitted without their <style> wrapper
+        html = f"<style>\n{prefix[bare_css.start():].strip()}\n</style>\n" + html[len(prefix):]
+        fixes.append("wrapped bare CSS in <style>")
+        first, last = html.find("<"), html.rfind(">")
+    if first > 0 and html[:first].strip():
+        html = html[first:]
+        last = html.rfind(">")
+        fixes.append("dropped text before first tag")
+    if last != -1 and html[last + 1:].strip():
+        html = html[:last + 1]
+        fixes.append("dropped text after last tag")
+
+    # <html>/<head>/<body> wrappers: keep the <style> from <head>, drop the rest
+    head = _HEAD_PATTERN.search(html)
+    if head:
+        html = html[:head.start()] + _HEAD_NOISE_PATTERN.sub("", head.group(1)) + html[head.end():]
+        fixes.append("unwrapped <head>")
+    if _WRAPPER_TAG_PATTERN.search(html):
+        html = _WRAPPER_TAG_PATTERN.sub("", html)
+        fixes.append("removed document wrapper tags")
+
+    # <style> opened but never closed: close it where the CSS ends (first tag after it)
+    style_open = _STYLE_OPEN_PATTERN.search(html)
+    if style_open and not _STYLE_CLOSE_PATTERN.search(html, style_open.end()):
+        next_tag = html.find("<", style_open.end())
+        insert_at = next_tag if next_tag != -1 else len(html)
+        html = html[:insert_at] + "</style>\n" + html[insert_at:]
+        fixes.append("closed unterminated <style>")
+
+    # Unclosed elements (typically from a truncated completion)
+    unclosed = _unclosed_tags(html)
+    if unclosed:
+        html = html.rstrip() + "\n" + "".join(f"</{tag}>" for tag in reversed(unclosed))
+        fixes.append(f"closed {len(unclosed)} unclosed tag(s)")
+
+    return html.strip(), fixes
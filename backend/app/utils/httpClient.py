@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import weakref
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from app.config import (
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    HTTP_LONG_READ_TIMEOUT,
+    HTTP_RETRIES,
+    HTTP_RETRY_BACKOFF
+)
+
+# Default (connect, read) timeouts. LONG_TIMEOUT is for calls where the remote side
+# does real work before answering (file conversion, image generation).
+DEFAULT_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+LONG_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_LONG_READ_TIMEOUT)
+
+# Only idempotent methods are retried; a POST is never replayed automatically
+RETRY_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> httpx.AsyncClient
+
+
+def _build_session():
+    retry = Retry(
+        total=HTTP_RETRIES,
+        backoff_factor=HTTP_RETRY_BACKOFF,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=RETRY_METHODS,
+        raise_on_status=False,
+        respect_retry_after_header=True
+    )
+    # urllib3 keeps one keep-alive pool per host; pool_connections is the number of
+    # hosts kept warm, pool_maxsize the connections kept per host
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=retry
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    """Returns the process-wide pooled session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def request(method, url, timeout=DEFAULT_TIMEOUT, **kwargs):
+    return get_session().request(method, url, timeout=timeout, **kwargs)
+
+
+def get(url, timeout=DEFAULT_TIMEOUT, **kwargs):
+    return request("GET", url, timeout=timeout, **kwargs)
+
+
+def post(url, timeout=DEFAULT_TIMEOUT, **kwargs):
+    return request("POST", url, timeout=timeout, **kwargs)
+
+
+def get_async_client():
+    """
+    Returns the pooled async client of the running event loop.
+    httpx async pools cannot move between event loops, so there is one client per loop.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        # The transport retries failed connection attempts; status retries are done in async_request
+        transport = httpx.AsyncHTTPTransport(
+            retries=HTTP_RETRIES,
+            limits=httpx.Limits(max_connections=HTTP_POOL_CONNECTIONS * HTTP_POOL_MAXSIZE, max_keepalive_connections=HTTP_POOL_MAXSIZE)
+        )
+        client = httpx.AsyncClient(transport=transport)
+        _async_clients[loop] = client
+    return client
+
+
+async def async_request(method, url, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """Async request() with the same timeouts, and the same status retries for idempotent methods, as the session."""
+    connect_timeout, read_timeout = timeout
+    attempts = HTTP_RETRIES + 1 if method in RETRY_METHODS else 1
+    for attempt in range(attempts):
+        response = await get_async_client().request(method, url, timeout=httpx.Timeout(read_timeout, connect=connect_timeout), **kwargs)
+        if response.status_code not in RETRY_STATUSES or attempt == attempts - 1:
+            return response
+        retry_after = response.headers.get("Retry-After", "")
+        await response.aclose()
+        await asyncio.sleep(int(retry_after) if retry_after.isdigit() else HTTP_RETRY_BACKOFF * (2 ** attempt))
+
+
+async def async_get(url, timeout=DEFAULT_TIMEOUT, **kwargs):
+    return await async_request("GET", url, timeout=timeout, **kwargs)
+
+
+async def async_post(url, timeout=DEFAULT_TIMEOUT, **kwargs):
+    return await async_request("POST", url, timeout=timeout, **kwargs)
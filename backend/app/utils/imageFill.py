@@ -0,0 +1,108 @@
+import base64
+import re
+from concurrent.futures import ThreadPoolExecutor
+from bs4 import BeautifulSoup
+from app.utils.imageGeneration import generate_image, get_cached_image, DEFAULT_MODEL
+from app.config import IMAGE_FILL_CONCURRENCY
+
+PLACEHOLDER_HOSTS = re.compile(r"(via\.placeholder\.com|placehold\.co|placeholder\.com|dummyimage\.com)", re.IGNORECASE)
+HEADING_TAGS = ["h1", "h2", "h3", "h4", "h5", "h6"]
+MAX_CONTEXT_CHARS = 300
+
+
+def _text(element):
+    return " ".join(element.get_text(" ", strip=True).split()) if element else ""
+
+
+def _derive_prompt(img):
+    """Builds an image prompt from the alt text and the closest heading/text around the image."""
+    parts = []
+    alt = (img.get("alt") or "").strip()
+    if alt and alt.lower() not in ("image", "placeholder", "logo"):
+        parts.append(alt)
+
+    # Walk up until a container with some text in it (the card/section the image belongs to)
+    container = img.parent
+    while container is not None and container.name not in ("[document]", "body") and len(_text(container)) < 40:
+        container = container.parent
+
+    heading = None
+    if container is not None:
+        heading = container.find(HEADING_TAGS)
+    if heading is None:
+        heading = img.find_previous(HEADING_TAGS)
+    if heading is not None and _text(heading):
+        parts.append(_text(heading))
+
+    if container is not None and container.name not in ("[document]", "body"):
+        paragraph = container.find("p")
+        if paragraph is not None and _text(paragraph):
+            parts.append(_text(paragraph)[:MAX_CONTEXT_CHARS])
+
+    if not parts:
+        return None
+
+    if img.get("alt", "").strip().lower() == "logo" or "logo" in " ".join(img.get("class", [])).lower():
+        return f"Minimal flat company logo for: {parts[0]}"
+    return f"Professional newsletter illustration, no text: {'. '.join(parts)}"
+
+
+def find_placeholder_images(soup):
+    """Returns the placeholder <img> elements in document order."""
+    return [img for img in soup.find_all("img") if PLACEHOLDER_HOSTS.search(img.get("src") or "")]
+
+
+def fill_placeholder_images(html, output_format=None, inline=True, model=DEFAULT_MODEL):
+    """
+    Generates images for every placeholder <img> concurrently and rewrites their src.
+
+    Args:
+        html: Generated template HTML
+        output_format: Optional forced image format, as for generate_image
+        inline: Embed images as data URLs (the default). With False, src points to
+                /api/images/<key>, which is served from this instance's evictable image
+                cache, so such HTML must be inlined before it is saved
+        model: imagerouter model name
+
+    Returns:
+        tuple: (rewritten html, list of {index, original_src, prompt, image_url | error})
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    images = find_placeholder_images(soup)
+    prompts = [_derive_prompt(img) for img in images]
+
+    def run(prompt):
+        try:
+            return prompt, generate_image(prompt, model=model, output_format=output_format), None
+        except Exception as e:
+            return prompt, None, str(e)
+
+    # Identical prompts are generated once
+    unique_prompts = list(dict.fromkeys(prompt for prompt in prompts if prompt))
+    results = {}
+    if unique_prompts:
+        with ThreadPoolExecutor(max_workers=min(IMAGE_FILL_CONCURRENCY, len(unique_prompts))) as executor:
+            for prompt, result, error in executor.map(run, unique_prompts):
+                results[prompt] = (result, error)
+
+    mapping = []
+    for index, (img, prompt) in enumerate(zip(images, prompts)):
+        entry = {"index": index, "original_src": img.get("src"), "prompt": prompt}
+        result, error = results.get(prompt, (None, "No context found to derive a prompt"))
+        if error:
+            entry["error"] = error
+            mapping.append(entry)
+            continue
+
+        entry["image_url"] = f"/api/images/{result['cache_key']}"
+        src = entry["image_url"]
+        if inline:
+            cached = get_cached_image(result["cache_key"])
+            if cached:
+                src = f"data:{cached[1]};base64,{base64.b64encode(cached[0]).decode('utf-8')}"
+        img["src"] = src
+        if not img.get("alt"):
+            img["alt"] = prompt[:120]
+        mapping.append(entry)
+
+    return str(soup), mapping
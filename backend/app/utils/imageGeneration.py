@@ -1,14 +1,49 @@
-import requests
+import asyncio
+from app.utils import httpClient
+from app.utils.diskCache import DiskLRUCache
 from PIL import Image
 from io import BytesIO
 import base64
-from app.config import IMAGEROUTER_API_KEY
+import hashlib
+import re
+from app.config import IMAGEROUTER_API_KEY, IMAGE_CACHE_PATH, IMAGE_CACHE_MAX_BYTES, IMAGE_ALLOWED_MODELS
 
 API_URL = "https://api.imagerouter.io/v1/openai/images/generations"
 API_KEY = IMAGEROUTER_API_KEY
+DEFAULT_MODEL = "black-forest-labs/FLUX-1-schnell:free"
+ALLOWED_MODELS = {DEFAULT_MODEL, *IMAGE_ALLOWED_MODELS}
 
+# Generated images keyed by (prompt, model, output format); the format is sniffed on read
+image_cache = DiskLRUCache(IMAGE_CACHE_PATH, IMAGE_CACHE_MAX_BYTES)
 
-def generate_image(user_prompt):
+MIME_TYPES = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+    "gif": "image/gif"
+}
+OUTPUT_FORMATS = {"png", "jpeg", "webp"}
+CACHE_KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def sniff_format(image_data):
+    """Detects the image format from its magic bytes, without decoding it."""
+    if image_data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if image_data.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if image_data[:4] == b"RIFF" and image_data[8:12] == b"WEBP":
+        return "webp"
+    if image_data[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    return None
+
+
+def _cache_hash(user_prompt, model, output_format):
+    return hashlib.sha256(f"{model}\x1f{output_format or 'original'}\x1f{user_prompt.strip()}".encode("utf-8")).hexdigest()
+
+
+def _image_request(user_prompt, model):
     headers = {
         "Authorization": f"Bearer {API_KEY}",
         "Content-Type": "application/json"
@@ -16,33 +51,127 @@ def generate_image(user_prompt):
 
     payload = {
         "prompt": user_prompt,
-        "model": "black-forest-labs/FLUX-1-schnell:free",
+        "model": model,
         "quality": "auto"
     }
+    return headers, payload
+
+
+def _fetch_image(user_prompt, model):
+    headers, payload = _image_request(user_prompt, model)
+    response = httpClient.post(API_URL, headers=headers, json=payload, timeout=httpClient.LONG_TIMEOUT)
+    response.raise_for_status()
+    data = response.json()
+
+    result = data.get("data", [])[0]
+
+    if "b64_json" in result:
+        return base64.b64decode(result["b64_json"])
+    elif "url" in result:
+        image_response = httpClient.get(result["url"])
+        image_response.raise_for_status()
+        return image_response.content
+    else:
+        raise ValueError("No image data found in response.")
+
 
-    response = requests.post(API_URL, headers=headers, json=payload)
+async def _fetch_image_async(user_prompt, model):
+    headers, payload = _image_request(user_prompt, model)
+    response = await httpClient.async_post(API_URL, headers=headers, json=payload, timeout=httpClient.LONG_TIMEOUT)
     response.raise_for_status()
     data = response.json()
 
     result = data.get("data", [])[0]
-    image = None
 
     if "b64_json" in result:
-        image_data = base64.b64decode(result["b64_json"])
-        image = Image.open(BytesIO(image_data))
+        return base64.b64decode(result["b64_json"])
     elif "url" in result:
-        image_response = requests.get(result["url"])
+        image_response = await httpClient.async_get(result["url"])
         image_response.raise_for_status()
-        image = Image.open(BytesIO(image_response.content))
+        return image_response.content
     else:
         raise ValueError("No image data found in response.")
 
-    # Always return base64-encoded PNG
+
+def _encode(image_data, output_format):
+    image = Image.open(BytesIO(image_data))
+    if output_format == "jpeg":
+        image = image.convert("RGB")
     output_buffer = BytesIO()
-    image.convert("RGB").save(output_buffer, format="PNG")
-    base64_str = base64.b64encode(output_buffer.getvalue()).decode("utf-8")
-    
-    return {
-        "image_base64": base64_str,
-        "mime_type": "image/png"
-    }
+    image.save(output_buffer, format=output_format.upper(), **({"quality": 85} if output_format in ("jpeg", "webp") else {}))
+    return output_buffer.getvalue()
+
+
+def _lookup(user_prompt, model, output_format):
+    """Validates the request; returns (cache_key, result of a cache hit or None)."""
+    if output_format and output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format}")
+    if model not in ALLOWED_MODELS:
+        raise ValueError(f"Unsupported image model: {model}")
+
+    cache_key = _cache_hash(user_prompt, model, output_format)
+    cached_path = image_cache.path_for(cache_key)
+    if cached_path:
+        try:
+            with open(cached_path, "rb") as f:
+                header = f.read(12)
+            return cache_key, {"cache_key": cache_key, "mime_type": MIME_TYPES.get(sniff_format(header), "application/octet-stream"), "cached": True}
+        except FileNotFoundError:
+            pass  # evicted since the lookup; generate it again
+    return cache_key, None
+
+
+def _store(cache_key, image_data, output_format):
+    source_format = sniff_format(image_data)
+
+    # Pass the bytes through untouched when the format already fits
+    if output_format and output_format != source_format:
+        image_data, fmt = _encode(image_data, output_format), output_format
+    elif source_format:
+        fmt = source_format
+    else:
+        image_data, fmt = _encode(image_data, "png"), "png"
+
+    image_cache.put(cache_key, image_data)
+    return {"cache_key": cache_key, "mime_type": MIME_TYPES[fmt], "cached": False}
+
+
+def generate_image(user_prompt, model=DEFAULT_MODEL, output_format=None):
+    """
+    Generates (or reuses) an image for a prompt.
+
+    Args:
+        user_prompt: Text prompt sent to imagerouter
+        model: imagerouter model name, one of ALLOWED_MODELS
+        output_format: 'png', 'jpeg' or 'webp' to force a format; None keeps the
+                       source format whenever the browser can display it
+
+    Returns:
+        dict: cache_key of the cached blob, its mime_type and a cached flag
+    """
+    cache_key, cached = _lookup(user_prompt, model, output_format)
+    if cached:
+        return cached
+    return _store(cache_key, _fetch_image(user_prompt, model), output_format)
+
+
+async def generate_image_async(user_prompt, model=DEFAULT_MODEL, output_format=None):
+    """
+    Awaitable generate_image. The imagerouter calls run on the event loop; the cache
+    lookup, re-encoding and cache write run in a worker thread.
+    """
+    cache_key, cached = await asyncio.to_thread(_lookup, user_prompt, model, output_format)
+    if cached:
+        return cached
+    image_data = await _fetch_image_async(user_prompt, model)
+    return await asyncio.to_thread(_store, cache_key, image_data, output_format)
+
+
+def get_cached_image(cache_key):
+    """Returns (bytes, mime_type) of a cached image, or None if unknown or evicted."""
+    if not CACHE_KEY_PATTERN.match(cache_key or ""):
+        return None
+    image_data = image_cache.get(cache_key)
+    if image_data is None:
+        return None
+    return image_data, MIME_TYPES.get(sniff_format(image_data), "application/octet-stream")
@@ -0,0 +1,167 @@
+import json
+import os
+import sqlite3
+import threading
+import traceback
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from app.config import JOB_DB_PATH, JOB_WORKERS, JOB_MAX_PENDING
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class JobQueue:
+    """
+    Bounded background executor for long running work (e.g. newsletter generation).
+
+    Job state lives in a local SQLite file so that status/result survive a restart.
+    Jobs that were still queued or running when the process died are picked up
+    again by resume() as long as a handler for their kind is registered; the ones
+    that do not fit in max_pending wait in a backlog and start as slots free up.
+    """
+
+    def __init__(self, db_path=JOB_DB_PATH, workers=JOB_WORKERS, max_pending=JOB_MAX_PENDING):
+        self.db_path = db_path
+        self.max_pending = max_pending
+        self._handlers = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._backlog = deque()  # resumed job ids waiting for a free slot
+        self._backlog_lock = threading.Lock()
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    params TEXT,
+                    result TEXT,
+                    error TEXT,
+                    pid INTEGER,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_idx ON jobs (status)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _update(self, job_id, **fields):
+        fields["updated_at"] = datetime.utcnow().isoformat()
+        columns = ", ".join(f"{key} = ?" for key in fields)
+        self._connect().execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def register(self, kind, handler):
+        """Registers the callable that runs jobs of this kind. handler(job_id, params) -> JSON-able result."""
+        self._handlers[kind] = handler
+
+    def submit(self, user_id, kind, params):
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        if not self._pending.acquire(blocking=False):
+            raise QueueFullError("Too many jobs in progress, try again later")
+
+        job_id = str(uuid.uuid4())
+        timestamp = datetime.utcnow().isoformat()
+        try:
+            self._connect().execute(
+                "INSERT INTO jobs (id, user_id, kind, status, params, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, user_id, kind, QUEUED, json.dumps(params), timestamp, timestamp)
+            )
+            self._executor.submit(self._run, job_id)
+        except Exception:
+            self._pending.release()
+            raise
+        return job_id
+
+    def _run(self, job_id):
+        try:
+            conn = self._connect()
+            # Claim the job atomically so two workers resuming the same DB never both run it
+            claimed = conn.execute(
+                "UPDATE jobs SET status = ?, pid = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (RUNNING, os.getpid(), datetime.utcnow().isoformat(), job_id, QUEUED)
+            ).rowcount
+            if not claimed:
+                return
+
+            row = conn.execute("SELECT kind, params FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            handler = self._handlers[row["kind"]]
+            try:
+                result = handler(job_id, json.loads(row["params"] or "{}"))
+                self._update(job_id, status=DONE, result=json.dumps(result))
+            except Exception as e:
+                traceback.print_exc()
+                self._update(job_id, status=FAILED, error=str(e))
+        finally:
+            self._pending.release()
+            self._drain_backlog()
+
+    def _drain_backlog(self):
+        with self._backlog_lock:
+            while self._backlog and self._pending.acquire(blocking=False):
+                self._executor.submit(self._run, self._backlog.popleft())
+
+    def get(self, job_id, user_id):
+        row = self._connect().execute(
+            "SELECT * FROM jobs WHERE id = ? AND user_id = ?", (job_id, user_id)
+        ).fetchone()
+        if row is None:
+            return None
+
+        job = dict(row)
+        job.pop("params", None)
+        job.pop("pid", None)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def resume(self):
+        """Re-queues jobs left behind by a previous process."""
+        conn = self._connect()
+        for row in conn.execute("SELECT id, pid FROM jobs WHERE status = ?", (RUNNING,)).fetchall():
+            if not _pid_alive(row["pid"]):
+                self._update(row["id"], status=QUEUED, pid=None)
+
+        resumed = 0
+        with self._backlog_lock:
+            for row in conn.execute("SELECT id, kind FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)).fetchall():
+                if row["kind"] in self._handlers and row["id"] not in self._backlog:
+                    self._backlog.append(row["id"])
+                    resumed += 1
+        self._drain_backlog()
+        return resumed
+
+
+def _pid_alive(pid):
+    if not pid:
+        return False
+    if pid == os.getpid():
+        return False  # our own pid means a previous process that got the same id after restart
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+job_queue = JobQueue()
@@ -0,0 +1,109 @@
+"""
+Minimal JSON Patch (RFC 6902) support: a structural diff producing add/remove/replace
+operations, and a function applying them.
+"""
+
+
+def _escape(token):
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token):
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def _same(a, b):
+    # bool is an int subclass, so True == 1 must not count as unchanged; containers are
+    # compared element by element because their == would let {"a": 1} equal {"a": True}
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_same(value, b[key]) for key, value in a.items())
+    if isinstance(a, list):
+        return len(a) == len(b) and all(map(_same, a, b))
+    return a == b
+
+
+def _diff_list(old, new, path, ops):
+    # Trim the common prefix and suffix so a single insert/delete does not shift every element
+    start = 0
+    while start < len(old) and start < len(new) and _same(old[start], new[start]):
+        start += 1
+    old_end, new_end = len(old), len(new)
+    while old_end > start and new_end > start and _same(old[old_end - 1], new[new_end - 1]):
+        old_end -= 1
+        new_end -= 1
+
+    common = min(old_end - start, new_end - start)
+    for offset in range(common):
+        _diff(old[start + offset], new[start + offset], f"{path}/{start + offset}", ops)
+
+    index = start + common
+    for offset in range(new_end - start - common):
+        ops.append({"op": "add", "path": f"{path}/{index + offset}", "value": new[index + offset]})
+    for _ in range(old_end - start - common):
+        ops.append({"op": "remove", "path": f"{path}/{index}"})
+
+
+def _diff(old, new, path, ops):
+    if _same(old, new):
+        return
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": f"{path}/{_escape(key)}", "value": value})
+            else:
+                _diff(old[key], value, f"{path}/{_escape(key)}", ops)
+    elif isinstance(old, list) and isinstance(new, list):
+        _diff_list(old, new, path, ops)
+    else:
+        ops.append({"op": "replace", "path": path, "value": new})
+
+
+def diff(old, new):
+    """Returns the list of JSON Patch operations turning old into new."""
+    ops = []
+    _diff(old, new, "", ops)
+    return ops
+
+
+def _resolve(doc, path):
+    """Returns (parent container, last token) for a JSON pointer."""
+    tokens = [_unescape(token) for token in path.split("/")[1:]]
+    parent = doc
+    for token in tokens[:-1]:
+        parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+    last = tokens[-1]
+    if isinstance(parent, list):
+        last = len(parent) if last == "-" else int(last)
+    return parent, last
+
+
+def apply_patch(doc, ops):
+    """
+    Applies JSON Patch operations (add/remove/replace) to doc, in place where possible.
+    Returns the patched document.
+    """
+    for op in ops:
+        if op["path"] == "":
+            if op["op"] not in ("add", "replace"):
+                raise ValueError(f"Unsupported operation on the document root: {op['op']}")
+            doc = op["value"]
+            continue
+
+        parent, key = _resolve(doc, op["path"])
+        if op["op"] == "add":
+            if isinstance(parent, list):
+                parent.insert(key, op["value"])
+            else:
+                parent[key] = op["value"]
+        elif op["op"] == "remove":
+            del parent[key]
+        elif op["op"] == "replace":
+            parent[key] = op["value"]
+        else:
+            raise ValueError(f"Unsupported JSON Patch operation: {op['op']}")
+    return doc
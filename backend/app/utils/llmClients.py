@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import weakref
+import httpx
+from openai import OpenAI, AsyncOpenAI
+from app.config import (
+    GOOGLE_STUDIO_API_KEY,
+    OPENROUTER_API_KEY,
+    LLM_MAX_CONNECTIONS,
+    LLM_MAX_KEEPALIVE,
+    LLM_CONNECT_TIMEOUT,
+    LLM_TIMEOUT
+)
+
+GEMINI = "gemini"
+OPENROUTER = "openrouter"
+
+# Both providers are reached through their OpenAI-compatible endpoints
+PROVIDERS = {
+    GEMINI: {
+        "base_url": "https://generativelanguage.googleapis.com/v1beta/openai/",
+        "api_key": GOOGLE_STUDIO_API_KEY
+    },
+    OPENROUTER: {
+        "base_url": "https://openrouter.ai/api/v1",
+        "api_key": OPENROUTER_API_KEY
+    }
+}
+
+_clients = {}
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> {provider: AsyncOpenAI}
+_lock = threading.Lock()
+
+
+def _limits():
+    return httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_KEEPALIVE)
+
+
+def _timeout():
+    return httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+
+
+def get_client(provider):
+    """
+    Returns the shared synchronous client for a provider.
+    The client (and its connection pool) is created once per process and is thread safe.
+    """
+    client = _clients.get(provider)
+    if client is None:
+        with _lock:
+            client = _clients.get(provider)
+            if client is None:
+                config = PROVIDERS[provider]
+                client = OpenAI(
+                    base_url=config["base_url"],
+                    api_key=config["api_key"],
+                    timeout=_timeout(),
+                    http_client=httpx.Client(limits=_limits(), timeout=_timeout())
+                )
+                _clients[provider] = client
+    return client
+
+
+def get_async_client(provider):
+    """
+    Returns the shared async client for a provider on the running event loop.
+
+    httpx async pools cannot move between event loops, so there is one client per
+    loop; it is dropped together with the loop.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        loop_clients = _async_clients.setdefault(loop, {})
+        client = loop_clients.get(provider)
+        if client is None:
+            config = PROVIDERS[provider]
+            client = AsyncOpenAI(
+                base_url=config["base_url"],
+                api_key=config["api_key"],
+                timeout=_timeout(),
+                http_client=httpx.AsyncClient(limits=_limits(), timeout=_timeout())
+            )
+            loop_clients[provider] = client
+    return client
+
+
+def get_gemini_client():
+    return get_client(GEMINI)
+
+
+def get_openrouter_client():
+    return get_client(OPENROUTER)
+
+
+def get_async_gemini_client():
+    return get_async_client(GEMINI)
+
+
+def get_async_openrouter_client():
+    return get_async_client(OPENROUTER)
@@ -0,0 +1,319 @@
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from app.utils import httpClient
+from app.utils.diskCache import DiskLRUCache
+from app.utils.jsonPatch import diff, apply_patch
+from app.config import (
+    PROJECT_JSON_CACHE_PATH,
+    PROJECT_JSON_CACHE_MAX_BYTES,
+    PROJECT_JSON_MEMORY_MAX_BYTES,
+    PROJECT_JSON_REVALIDATE_AFTER,
+    PROJECT_STORAGE_MODE,
+    PROJECT_KEYFRAME_INTERVAL,
+    PROJECT_MATERIALIZED_MAX_BYTES,
+    PROJECT_COMPRESSION,
+    PROJECT_COMPRESSION_LEVEL
+)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Delta versions are stored as {"__delta__": 1, "depth": n, "base": <previous json_path>, "patch": [...]}
+DELTA_MARKER = b'{"__delta__"'
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+FILE_SUFFIXES = {None: ".json", "gzip": ".json.gz", "zstd": ".json.zst"}
+
+
+def _compression():
+    if PROJECT_COMPRESSION == "zstd" and zstandard is None:
+        print("zstandard is not installed, compressing project JSON with gzip instead")
+        return "gzip"
+    return PROJECT_COMPRESSION if PROJECT_COMPRESSION in ("gzip", "zstd") else None
+
+
+def compress_project_bytes(data):
+    """
+    Compresses serialized project JSON as configured by PROJECT_COMPRESSION.
+    Returns (bytes, content encoding or None).
+    """
+    encoding = _compression()
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=PROJECT_COMPRESSION_LEVEL or 6, mtime=0), encoding
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=PROJECT_COMPRESSION_LEVEL or 3).compress(data), encoding
+    return data, None
+
+
+def decompress_project_bytes(raw):
+    """
+    Decodes a stored project object by its magic bytes; plain JSON (older objects,
+    or bodies already decoded by the HTTP client) is returned unchanged.
+    """
+    if raw.startswith(GZIP_MAGIC):
+        return gzip.decompress(raw)
+    if raw.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise ValueError("zstd-compressed project JSON but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(raw)
+    return raw
+
+
+def project_upload_options(encoding):
+    """
+    Supabase Storage file options for a project object with the given content encoding.
+    The encoding is recorded in the object metadata only: storage3 sends file_options
+    "headers" on the multipart upload request itself, whose body is not compressed.
+    Readers detect the codec by magic bytes (decompress_project_bytes).
+    """
+    if not encoding:
+        return {"content-type": "application/json"}
+    return {
+        "content-type": "application/json",
+        "metadata": {"content-encoding": encoding}
+    }
+
+
+class ProjectFetchError(Exception):
+    """Raised when a project JSON document cannot be fetched or is not valid JSON."""
+
+    def __init__(self, message, decode_error=False):
+        super().__init__(message)
+        self.decode_error = decode_error
+
+
+class BytesLRU:
+    """In-process LRU of byte strings, bounded by their total size."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+            if len(value) > self.max_bytes:
+                return
+            self._entries[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "size_bytes": self._size, "max_bytes": self.max_bytes}
+
+
+class ProjectJSONCache:
+    """
+    Read-through cache of project JSON documents, keyed by their json_path.
+
+    A json_path names one immutable version, so entries are served without a
+    network round trip. Entries older than revalidate_after are checked with a
+    conditional GET (If-None-Match / If-Modified-Since); a 304 only refreshes them.
+    Documents are kept as raw bytes, in a byte-bounded in-process LRU in front of
+    a DiskLRUCache shared by all workers.
+    """
+
+    def __init__(self, directory, disk_max_bytes, memory_max_bytes, revalidate_after):
+        self.disk = DiskLRUCache(directory, disk_max_bytes)
+        self.memory_max_bytes = memory_max_bytes
+        self.revalidate_after = revalidate_after
+        self._entries = OrderedDict()  # key -> (raw, etag, last_modified, validated_at)
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "revalidated": 0, "fetches": 0}
+
+    @staticmethod
+    def _key(json_path):
+        return hashlib.sha256(json_path.encode("utf-8")).hexdigest()
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _remember(self, key, entry):
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key)[0])
+            if len(entry[0]) > self.memory_max_bytes:
+                return
+            self._entries[key] = entry
+            self._size += len(entry[0])
+            while self._size > self.memory_max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted[0])
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return entry
+
+        raw = self.disk.get(key)
+        if raw is None:
+            return None
+        meta = self.disk.get(f"{key}.meta")
+        meta = json.loads(meta) if meta else {}
+        entry = (raw, meta.get("etag"), meta.get("last_modified"), meta.get("validated_at", time.time()))
+        self._remember(key, entry)
+        self._count("disk_hits")
+        return entry
+
+    def _store(self, key, raw, etag, last_modified):
+        entry = (raw, etag, last_modified, time.time())
+        self._remember(key, entry)
+        self.disk.put(key, raw)
+        self.disk.put(f"{key}.meta", json.dumps({"etag": etag, "last_modified": last_modified, "validated_at": entry[3]}).encode("utf-8"))
+        return entry
+
+    def get(self, json_path):
+        """
+        Returns the raw JSON bytes stored at json_path.
+        Raises ProjectFetchError when the document cannot be fetched or is not JSON.
+        """
+        key = self._key(json_path)
+        entry = self._lookup(key)
+        if entry and time.time() - entry[3] < self.revalidate_after:
+            return entry[0]
+
+        headers = {}
+        if entry and entry[1]:
+            headers["If-None-Match"] = entry[1]
+        if entry and entry[2]:
+            headers["If-Modified-Since"] = entry[2]
+
+        response = httpClient.get(json_path, headers=headers)
+        if entry and response.status_code == 304:
+            self._count("revalidated")
+            return self._store(key, entry[0], entry[1], entry[2])[0]
+        if response.status_code != 200:
+            raise ProjectFetchError(f"Failed to fetch project JSON: status {response.status_code}")
+
+        try:
+            raw = decompress_project_bytes(response.content)
+        except (OSError, ValueError) as e:
+            raise ProjectFetchError(f"Failed to decompress {json_path}: {e}", decode_error=True)
+
+        # Validated once here, so cached bytes can be passed through without parsing
+        try:
+            json.loads(raw)
+        except ValueError:
+            raise ProjectFetchError(f"Failed to decode JSON from {json_path}", decode_error=True)
+
+        self._count("fetches")
+        return self._store(key, raw, response.headers.get("ETag"), response.headers.get("Last-Modified"))[0]
+
+    def stats(self):
+        with self._lock:
+            lookups = sum(self._stats.values())
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"] + self._stats["revalidated"]
+            return {
+                **self._stats,
+                "hit_rate": round(hits / lookups, 3) if lookups else None,
+                "memory_entries": len(self._entries),
+                "memory_bytes": self._size,
+                "disk": self.disk.stats()
+            }
+
+
+project_json_cache = ProjectJSONCache(
+    PROJECT_JSON_CACHE_PATH,
+    PROJECT_JSON_CACHE_MAX_BYTES,
+    PROJECT_JSON_MEMORY_MAX_BYTES,
+    PROJECT_JSON_REVALIDATE_AFTER
+)
+
+
+# Reconstructed delta versions, so a chain is replayed once and later versions start from here
+materialized_versions = BytesLRU(PROJECT_MATERIALIZED_MAX_BYTES)
+
+
+def _is_delta(raw):
+    return raw.startswith(DELTA_MARKER)
+
+
+def _materialize(json_path, raw):
+    # Walk back to a keyframe (or an already materialized version), then replay the patches forward
+    patches = []
+    while _is_delta(raw):
+        envelope = json.loads(raw)
+        patches.append(envelope["patch"])
+        if len(patches) > PROJECT_KEYFRAME_INTERVAL * 4:
+            raise ProjectFetchError(f"Delta chain of {json_path} does not reach a keyframe")
+        base = materialized_versions.get(envelope["base"])
+        raw = base if base is not None else project_json_cache.get(envelope["base"])
+
+    document = json.loads(raw)
+    for patch in reversed(patches):
+        document = apply_patch(document, patch)
+
+    data = json.dumps(document, separators=(",", ":")).encode("utf-8")
+    materialized_versions.put(json_path, data)
+    return data
+
+
+def load_project_json(json_path):
+    """
+    Returns the raw JSON bytes of a project version.
+    Delta-encoded versions are reconstructed transparently.
+    Raises ProjectFetchError (see ProjectJSONCache.get).
+    """
+    raw = project_json_cache.get(json_path)
+    if not _is_delta(raw):
+        return raw
+    return materialized_versions.get(json_path) or _materialize(json_path, raw)
+
+
+def encode_project_version(project_data, previous_json_path=None):
+    """
+    Serializes a new project version for storage.
+
+    In the "delta" storage mode a version is stored as a JSON patch against the
+    previous version, with a full keyframe every PROJECT_KEYFRAME_INTERVAL versions
+    (or whenever the patch would not be much smaller than the document).
+
+    Returns:
+        tuple: (bytes to upload, "keyframe" or "delta")
+    """
+    full = json.dumps(project_data, separators=(",", ":")).encode("utf-8")
+    if PROJECT_STORAGE_MODE != "delta" or not previous_json_path:
+        return full, "keyframe"
+
+    try:
+        previous_raw = project_json_cache.get(previous_json_path)
+        depth = json.loads(previous_raw)["depth"] if _is_delta(previous_raw) else 0
+        if depth + 1 >= PROJECT_KEYFRAME_INTERVAL:
+            return full, "keyframe"
+        previous = json.loads(load_project_json(previous_json_path))
+    except ProjectFetchError as e:
+        print(f"Previous version unavailable, storing a keyframe: {e}")
+        return full, "keyframe"
+
+    envelope = json.dumps(
+        {"__delta__": 1, "depth": depth + 1, "base": previous_json_path, "patch": diff(previous, project_data)},
+        separators=(",", ":")
+    ).encode("utf-8")
+    if len(envelope) * 2 > len(full):
+        return full, "keyframe"
+    return envelope, "delta"
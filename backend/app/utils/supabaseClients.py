@@ -0,0 +1,34 @@
+import asyncio
+import weakref
+from supabase import acreate_client, AsyncClient
+from app.config import SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY
+
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> AsyncClient
+_creating = weakref.WeakKeyDictionary()  # event loop -> task creating its client
+
+
+async def get_async_supabase() -> AsyncClient:
+    """
+    Returns the service-role async Supabase client of the running event loop.
+
+    Like the async LLM clients, its connection pool is bound to one loop; with the
+    shared worker loop (eventLoop.worker_loop) that means one client per worker.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is not None:
+        return client
+
+    # Concurrent first callers wait for the same creation instead of racing
+    task = _creating.get(loop)
+    if task is None:
+        task = loop.create_task(acreate_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY))
+        _creating[loop] = task
+    try:
+        client = await task
+    finally:
+        # A failed creation is forgotten, so the next call tries again
+        if _creating.get(loop) is task:
+            del _creating[loop]
+    _async_clients[loop] = client
+    return client
@@ -1,10 +1,53 @@
-from openai import OpenAI
+import asyncio
 import os
 import re
-from app.config import GOOGLE_STUDIO_API_KEY
+import threading
+from app.utils.llmClients import get_async_gemini_client
+from app.utils.eventLoop import run_async
+from app.utils.htmlRepair import repair_html, validate_html
+from app.config import TEMPLATE_MAX_ATTEMPTS
 import time
 from bs4 import BeautifulSoup
 
+# Process-wide counters to track wasted generations
+_stats_lock = threading.Lock()
+generation_stats = {
+    "generations": 0,
+    "model_calls": 0,
+    "retries": 0,
+    "local_repairs": 0,
+    "exhausted": 0
+}
+
+
+class TemplateGenerationError(Exception):
+    pass
+
+
+def _count(**increments):
+    with _stats_lock:
+        for key, value in increments.items():
+            generation_stats[key] += value
+
+
+def get_generation_stats():
+    with _stats_lock:
+        return dict(generation_stats)
+
+
+def finalize_html(raw_html):
+    """
+    Cleans and locally repairs one model completion.
+    Returns (html, fixes, problems); problems is empty when the template is usable.
+    """
+    html_string = clean_html_string(raw_html or "")
+    problems = validate_html(html_string)
+    fixes = []
+    if problems:
+        html_string, fixes = repair_html(html_string)
+        problems = validate_html(html_string)
+    return html_string, fixes, problems
+
 def clean_html_string(html_string):
     if html_string.startswith("```html"):
         html_string = html_string[7:]  # Remove ```html
@@ -21,16 +64,11 @@ def isHTML(text):
     return "<style>" in lower and "</style>" in lower
 
 
-def no_template_generation(user_prompt, pathToSaveHtml,tone, topic):
+async def polish_prompt(client, user_prompt, topic):
   pro_prompt = f"""You are an expert copywriter and HTML email designer. First, take the user's raw prompt that contains newsletter content (such as company information, announcements, goals, etc.) and rewrite it in a more professional, polished, and newsletter-appropriate tone. Maintain the original intent, meaning, and key points, but enhance clarity, tone, and grammar to match corporate or marketing communication standards. Do not remove any meaningful user-provided information—only reword it to sound better.
 User prompt is: {user_prompt}. Topic is {topic} RETURN ONLY THE UPDATED PROMPT. DO NOT SAY ANYTHING ELSE. """
 
-  client = OpenAI(
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
-    api_key=GOOGLE_STUDIO_API_KEY,
-  )
-
-  polish_response = client.chat.completions.create(
+  polish_response = await client.chat.completions.create(
      extra_headers={
         "HTTP-Referer": "http://localhost:5173/generator", # Optional. Site URL for rankings on openrouter.ai.
     },
@@ -45,10 +83,11 @@ User prompt is: {user_prompt}. Topic is {topic} RETURN ONLY THE UPDATED PROMPT.
 
   polished_prompt = polish_response.choices[0].message.content 
   print("Polished prompt: ",polished_prompt)
-  html_string = ""
-  while(not isHTML(html_string)):
-    print(tone)
-    generate_template=f""""Create a Professional HTML Newsletter Template 
+  return polished_prompt
+
+
+def build_template_prompt(polished_prompt, tone):
+  return f""""Create a Professional HTML Newsletter Template 
 Design a responsive newsletter layout (790px x 1250px) with embedded CSS styling. Requirements:
 Select one random layout: hero-first, card-style, stacked-content, column-grid, sidebar-left, or sidebar-right
 Company branding: logo and name (top-left or centered)
@@ -75,8 +114,22 @@ No <html>, <head>, or <body> wrapper tags
 No placeholder text (Lorem Ipsum) - use meaningful content or leave empty
 Include user-provided content: {polished_prompt} in specified tone: {tone}
 Output: Clean HTML code only, no explanations or comments."""
-    
-    html_response = client.chat.completions.create(
+
+
+def save_generated_html(html_string, pathToSaveHtml):
+  if not os.path.exists(pathToSaveHtml): os.makedirs(pathToSaveHtml)
+  with open(f"{pathToSaveHtml}/generated_output.html", "w") as f:
+    f.write(html_string)
+
+
+async def no_template_generation_async(user_prompt, pathToSaveHtml, tone, topic):
+  client = get_async_gemini_client()
+  polished_prompt = await polish_prompt(client, user_prompt, topic)
+
+  report = {"attempts": 0, "fixes": [], "problems": []}
+  for attempt in range(1, TEMPLATE_MAX_ATTEMPTS + 1):
+    report["attempts"] = attempt
+    html_response = await client.chat.completions.create(
       extra_headers={
         "HTTP-Referer": "http://localhost:5173/generator", # Optional. Site URL for rankings on openrouter.ai.
       },
@@ -84,16 +137,93 @@ Output: Clean HTML code only, no explanations or comments."""
       messages=[
         {
           "role": "user",
-          "content": generate_template
+          "content": build_template_prompt(polished_prompt, tone)
         }
       ]
     )
 
-    if not os.path.exists(pathToSaveHtml): os.mkdir(pathToSaveHtml)
-    html_string = html_response.choices[0].message.content
-    html_string = clean_html_string(html_string)
-  
-  
-  with open(f"{pathToSaveHtml}/generated_output.html", "w") as f:
-    f.write(html_string)
+    html_string, report["fixes"], report["problems"] = finalize_html(html_response.choices[0].message.content)
+    if not report["problems"]:
+      break
+    print(f"Generated template rejected (attempt {attempt}): {report['problems']}")
+
+  _record(report)
+  if report["problems"]:
+    raise TemplateGenerationError(f"No valid template after {report['attempts']} attempts: {report['problems']}")
+
+  await asyncio.to_thread(save_generated_html, html_string, pathToSaveHtml)
+  return report
+
+
+def no_template_generation(user_prompt, pathToSaveHtml, tone, topic):
+  """Synchronous no_template_generation_async, run on the worker's shared event loop."""
+  return run_async(no_template_generation_async(user_prompt, pathToSaveHtml, tone, topic))
+
+
+def _record(report):
+  _count(
+    generations=1,
+    model_calls=report["attempts"],
+    retries=report["attempts"] - 1,
+    local_repairs=1 if report["fixes"] else 0,
+    exhausted=1 if report["problems"] else 0
+  )
+  print(f"Template generation: {report['attempts']} attempt(s), local fixes: {report['fixes'] or 'none'}")
+
+
+async def stream_no_template_generation(user_prompt, pathToSaveHtml, tone, topic):
+  """
+  Streaming variant of no_template_generation (an async generator).
+
+  Yields (event, data) tuples as the template is produced:
+    ("status", {...})  progress notes, the first one is sent before any model call
+    ("chunk", {...})   raw HTML text as it arrives from the model
+    ("retry", {...})   the finished output was not valid HTML and is being regenerated
+    ("done", {...})    final cleaned HTML, also saved to pathToSaveHtml
+  Raises TemplateGenerationError once the attempt budget is used up.
+  """
+  yield "status", {"stage": "polishing_prompt"}
+
+  client = get_async_gemini_client()
+  polished_prompt = await polish_prompt(client, user_prompt, topic)
+
+  report = {"attempts": 0, "fixes": [], "problems": []}
+  for attempt in range(1, TEMPLATE_MAX_ATTEMPTS + 1):
+    report["attempts"] = attempt
+    yield "status", {"stage": "generating", "attempt": attempt}
+
+    stream = await client.chat.completions.create(
+      extra_headers={
+        "HTTP-Referer": "http://localhost:5173/generator",
+      },
+      model="gemini-2.5-flash",
+      messages=[
+        {
+          "role": "user",
+          "content": build_template_prompt(polished_prompt, tone)
+        }
+      ],
+      stream=True
+    )
+
+    parts = []
+    async for event in stream:
+      if not event.choices:
+        continue
+      delta = event.choices[0].delta.content
+      if delta:
+        parts.append(delta)
+        yield "chunk", {"attempt": attempt, "html": delta}
+
+    html_string, report["fixes"], report["problems"] = finalize_html("".join(parts))
+    if not report["problems"]:
+      break
+    if attempt < TEMPLATE_MAX_ATTEMPTS:
+      yield "retry", {"attempt": attempt, "problems": report["problems"]}
+
+  _record(report)
+  if report["problems"]:
+    raise TemplateGenerationError(f"No valid template after {report['attempts']} attempts: {report['problems']}")
 
+  await asyncio.to_thread(save_generated_html, html_string, pathToSaveHtml)
+  yield "done", {"html": html_string, "attempts": report["attempts"], "fixes": report["fixes"]}
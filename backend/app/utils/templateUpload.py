@@ -1,19 +1,23 @@
 from bs4 import BeautifulSoup
+import asyncio
 import time
 import base64
-from openai import OpenAI
 import os
-import requests
+from app.utils import httpClient
 import json
+from html import escape
 from app.config import (
     CONVERT_API_SECRET,
     OUTPUT_PATH,
     INPUT_PATH,
-    GOOGLE_STUDIO_API_KEY
+    CONTENT_CHUNK_SIZE,
+    CONTENT_CHUNK_CONCURRENCY,
+    CONTENT_CHUNK_RETRIES
 )
+from app.utils.llmClients import get_async_gemini_client
 import re
 
-async def convert_pdf_to_html(fileBytes, filename):
+async def convert_pdf_to_html(fileBytes, filename, output_dir=INPUT_PATH):
     payload = {
         "Parameters": [
             {"Name": "File", "FileValue": {"Name": filename, "Data": base64.b64encode(fileBytes).decode("utf-8")}},
@@ -21,81 +25,125 @@ async def convert_pdf_to_html(fileBytes, filename):
         ]
     }
     
-    response = requests.post(
+    response = httpClient.post(
         "https://v2.convertapi.com/convert/pdf/to/html", 
         json=payload, 
-        headers={"Authorization": f"Bearer {CONVERT_API_SECRET}", "Content-type": "application/json"}
+        headers={"Authorization": f"Bearer {CONVERT_API_SECRET}", "Content-type": "application/json"},
+        timeout=httpClient.LONG_TIMEOUT
     )
     
     if response.status_code == 200:
         download_url = response.json()["Files"][0]["Url"]
-        html_response = requests.get(download_url)
-        with open(f"{INPUT_PATH}/converted_output.html", "wb") as f:
+        html_response = httpClient.get(download_url, timeout=httpClient.LONG_TIMEOUT)
+        os.makedirs(output_dir, exist_ok=True)
+        with open(f"{output_dir}/converted_output.html", "wb") as f:
             f.write(html_response.content)
         return True
     return False    
 
-def process_html_to_template(filename):
+# lxml is a C parser and several times faster than html.parser on multi-page
+# converted PDFs; html.parser stays as the fallback when lxml is not installed
+try:
+    import lxml  # noqa: F401
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+# Known static mappings
+CLASS_MAP = {
+    'table-paragraph': 'body',
+    'heading-1': 'heading',
+    'heading-2': 'heading',
+    'heading-3': 'heading',
+    'body-text': 'body',
+    'title': 'title',
+    'list-paragraph': 'body',
+    'paragraph': 'body'
+}
+HEADING_CLASS_PATTERN = re.compile(r'heading-\d+')
+
+# Placeholder slots are marked with private-use characters so they cannot be confused with document text
+SLOT_OPEN, SLOT_CLOSE = "\ue000", "\ue001"
+SLOT_PATTERN = re.compile(f"{SLOT_OPEN}(\\w+){SLOT_CLOSE}")
+
+
+class CompiledTemplate:
+    """
+    Serialized template split once into literal segments and placeholder slots.
+    render() fills every slot in a single pass over the segment list.
+    """
+
+    def __init__(self, html):
+        # re.split with a capture group alternates: literal, slot, literal, slot, ..., literal
+        self.segments = SLOT_PATTERN.split(html)
+        self.placeholders = self.segments[1::2]
+
+    def render(self, values):
+        values = values or {}
+        parts = self.segments[:]
+        for index in range(1, len(parts), 2):
+            name = parts[index]
+            parts[index] = escape(str(values[name]), quote=False) if name in values else f"{{{{ {name} }}}}"
+        return "".join(parts)
+
+    def __str__(self):
+        return self.render({})
+
+
+# Helper function to determine placeholder type
+def get_placeholder_type(class_name):
+    if class_name in CLASS_MAP:
+        return CLASS_MAP[class_name]
+    elif HEADING_CLASS_PATTERN.match(class_name):
+        return 'heading'
+    elif 'body' in class_name:
+        return 'body'
+    return None
+
+
+def process_html_to_template(filename, input_dir=INPUT_PATH):
     # Read converted HTML
     try:
-        with open(f"{INPUT_PATH}/converted_output.html", "r", encoding="utf-8") as f:
+        with open(f"{input_dir}/converted_output.html", "r", encoding="utf-8") as f:
             html = f.read()
     except UnicodeDecodeError:
-        with open(f"{INPUT_PATH}/converted_output.html", "r", encoding="cp1252") as f:
+        with open(f"{input_dir}/converted_output.html", "r", encoding="cp1252") as f:
             html = f.read()
-    
-    soup = BeautifulSoup(html, "html.parser")
-    original_lengths = {}
-    placeholder_counter = {}
 
-    # Known static mappings
-    class_map = {
-        'table-paragraph': 'body',
-        'heading-1': 'heading',
-        'heading-2': 'heading',
-        'heading-3': 'heading',
-        'body-text': 'body',
-        'title': 'title',
-        'list-paragraph': 'body',
-        'paragraph': 'body'
-    }
+    return compile_template(html)
 
-    # Helper function to determine placeholder type
-    def get_placeholder_type(class_name):
-        if class_name in class_map:
-            return class_map[class_name]
-        elif re.match(r'heading-\d+', class_name):
-            return 'heading'
-        elif 'body' in class_name:
-            return 'body'
-        return None
 
-    # Process all <p> tags
-    for p in soup.find_all('p'):
-        if p.get('class'):
-            class_name = p.get('class')[1] if len(p.get('class')) > 1 else p.get('class')[0]
-            placeholder_type = get_placeholder_type(class_name)
+def compile_template(html):
+    """
+    Replaces the text of every recognised <p> with a placeholder slot.
+
+    Returns:
+        tuple: (CompiledTemplate, dict of placeholder -> original text length)
+    """
+    soup = BeautifulSoup(html, PARSER)
+    original_lengths = {}
+    placeholder_counter = {}
 
-            if placeholder_type:
-                original_text = p.get_text(strip=True)
+    # Process all <p> tags
+    for p in soup.find_all('p', class_=True):
+        classes = p['class']
+        class_name = classes[1] if len(classes) > 1 else classes[0]
+        placeholder_type = get_placeholder_type(class_name)
 
-                # Create unique placeholder
-                if placeholder_type not in placeholder_counter:
-                    placeholder_counter[placeholder_type] = 0
-                placeholder_counter[placeholder_type] += 1
-                unique_id = f"{placeholder_type}{placeholder_counter[placeholder_type]}"
+        if placeholder_type:
+            # Create unique placeholder
+            placeholder_counter[placeholder_type] = placeholder_counter.get(placeholder_type, 0) + 1
+            unique_id = f"{placeholder_type}{placeholder_counter[placeholder_type]}"
 
-                # Store length
-                original_lengths[unique_id] = len(original_text)
+            # Store length
+            original_lengths[unique_id] = len(p.get_text(strip=True))
 
-                # Remove nested <span> tags and set placeholder
-                for span in p.find_all('span'):
-                    span.unwrap()
-                p.string = f"{{{{ {unique_id} }}}}"
+            # Setting .string drops the nested <span> tags as well
+            p.string = f"{SLOT_OPEN}{unique_id}{SLOT_CLOSE}"
 
-    return soup, original_lengths
+    return CompiledTemplate(str(soup)), original_lengths
 
-def generate_content(placeholders, original_lengths, topic, content, tone):
+def get_limits(placeholders, original_lengths):
     # Calculate character limits
     limits = {}
     for placeholder in placeholders:
@@ -109,9 +157,82 @@ def generate_content(placeholders, original_lengths, topic, content, tone):
                 limits[placeholder] = 80
             else:
                 limits[placeholder] = 200
-    
-    prompt = f"""Generate unique newsletter content for each placeholder. Each should be distinct and cover different aspects of "{topic}" with tone "{tone}".
+    return limits
+
+
+def split_into_chunks(placeholders, max_size=CONTENT_CHUNK_SIZE):
+    """
+    Groups placeholders (in document order) into chunks of whole sections.
+    A section starts at each title/heading placeholder; a single oversized
+    section is split on its own.
+    """
+    sections, current = [], []
+    for placeholder in placeholders:
+        if current and placeholder.startswith(('title', 'heading')):
+            sections.append(current)
+            current = []
+        current.append(placeholder)
+    if current:
+        sections.append(current)
+
+    chunks, chunk = [], []
+    for section in sections:
+        if chunk and len(chunk) + len(section) > max_size:
+            chunks.append(chunk)
+            chunk = []
+        while len(section) > max_size:
+            chunks.append(section[:max_size])
+            section = section[max_size:]
+        chunk.extend(section)
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def _parse_json_object(text):
+    json_start, json_end = text.find('{'), text.rfind('}') + 1
+    if json_start == -1 or json_end == 0:
+        raise ValueError("No JSON object in model response")
+    return json.loads(text[json_start:json_end])
 
+
+async def _plan_sections(client, chunk_count, topic, content, tone):
+    """
+    Asks for one distinct angle per chunk, so concurrently generated chunks do not
+    repeat each other. Falls back to generic angles if the call fails.
+    """
+    fallback = [f"part {index + 1} of {chunk_count}: a different aspect of {topic} than the other parts" for index in range(chunk_count)]
+    prompt = f"""A newsletter about "{topic}" (tone "{tone}") is split into {chunk_count} consecutive parts.
+Source content: {content}
+
+Give each part one short, distinct focus so no two parts cover the same ground.
+Return ONLY JSON format: {{"parts": ["focus of part 1", "focus of part 2", ...]}} with exactly {chunk_count} entries."""
+
+    try:
+        response = await client.chat.completions.create(
+            extra_headers={"HTTP-Referer": "http://localhost:5173/generator"},
+            model="gemini-2.5-flash",
+            messages=[{"role": "user", "content": prompt}],
+            timeout=30
+        )
+        parts = _parse_json_object(response.choices[0].message.content).get("parts", [])
+        if len(parts) == chunk_count and all(isinstance(part, str) for part in parts):
+            return parts
+    except Exception as e:
+        print(f"Section planning error: {e}")
+    return fallback
+
+
+async def _generate_chunk(client, semaphore, limits, topic, content, tone, plan, index):
+    plan_text = "\n".join(f"- Part {number + 1}: {focus}" for number, focus in enumerate(plan))
+    shared = f"""
+This is part {index + 1} of {len(plan)} of the newsletter. Parts are written in parallel; the plan is:
+{plan_text}
+Write only about the focus of part {index + 1} and do not repeat what the other parts cover.
+""" if len(plan) > 1 else ""
+
+    prompt = f"""Generate unique newsletter content for each placeholder. Each should be distinct and cover different aspects of "{topic}" with tone "{tone}".
+{shared}
 Character limits: {json.dumps(limits)}
 Source content: {content}
 
@@ -123,33 +244,77 @@ Return ONLY JSON format:
 
 Make each section unique - no repetition."""
 
-    client = OpenAI(base_url="https://generativelanguage.googleapis.com/v1beta/openai/", api_key=GOOGLE_STUDIO_API_KEY, timeout=60)
-    
-    try:
-        response = client.chat.completions.create(
+    async with semaphore:
+        response = await client.chat.completions.create(
             extra_headers={"HTTP-Referer": "http://localhost:5173/generator"},
             model="gemini-2.5-flash",
-            messages=[{"role": "user", "content": prompt}]
+            messages=[{"role": "user", "content": prompt}],
+            timeout=60
         )
-        
-        text = response.choices[0].message.content
-        json_start, json_end = text.find('{'), text.rfind('}') + 1
-        
-        if json_start != -1 and json_end != -1:
-            generated = json.loads(text[json_start:json_end])
-            
-            # Validate length limits
-            for key, val in generated.items():
-                if key in limits and len(val) > limits[key]:
-                    generated[key] = val[:limits[key]-3] + "..."
-            
-            return generated
-    except Exception as e:
-        print(f"Content generation error: {e}")
-    
-    return None
 
-async def generate(topic, content, pdf_template, tone):
+    generated = _parse_json_object(response.choices[0].message.content)
+    return {key: str(val) for key, val in generated.items() if key in limits}
+
+
+async def generate_content(placeholders, original_lengths, topic, content, tone):
+    """
+    Generates content for all placeholders, split into section-aware chunks that
+    run concurrently. Only chunks that fail, or the placeholders a response left
+    out, are retried. Returns None if nothing could be generated.
+    """
+    limits = get_limits(placeholders, original_lengths)
+    chunks = split_into_chunks(placeholders)
+    if not chunks:
+        return {}
+
+    client = get_async_gemini_client()
+    semaphore = asyncio.Semaphore(CONTENT_CHUNK_CONCURRENCY)
+    plan = await _plan_sections(client, len(chunks), topic, content, tone) if len(chunks) > 1 else [topic]
+
+    generated = {}
+    pending = dict(enumerate(chunks))  # chunk index -> placeholder keys still unfilled
+    for attempt in range(1 + CONTENT_CHUNK_RETRIES):
+        results = await asyncio.gather(*(
+            _generate_chunk(client, semaphore, {key: limits[key] for key in keys}, topic, content, tone, plan, index)
+            for index, keys in pending.items()
+        ), return_exceptions=True)
+
+        unfilled = {}
+        for (index, keys), result in zip(pending.items(), results):
+            if isinstance(result, Exception):
+                print(f"Content generation error (chunk {index + 1}/{len(chunks)}, attempt {attempt + 1}): {result}")
+                unfilled[index] = keys
+                continue
+            generated.update(result)
+            # A response that parses but skips placeholders is retried for the missing ones only
+            missing = [key for key in keys if key not in result]
+            if missing:
+                print(f"Chunk {index + 1}/{len(chunks)}, attempt {attempt + 1}: {len(missing)} placeholder(s) missing from the response")
+                unfilled[index] = missing
+        pending = unfilled
+        if not pending:
+            break
+
+    still_unfilled = [key for keys in pending.values() for key in keys]
+    print(f"  {len(chunks)} chunk(s), {len(pending)} still incomplete after retries")
+    if still_unfilled:
+        print(f"  Placeholders left unfilled: {', '.join(still_unfilled)}")
+    if not generated:
+        return None
+
+    # Validate length limits
+    for key, val in generated.items():
+        if key in limits and len(val) > limits[key]:
+            generated[key] = val[:limits[key]-3] + "..."
+
+    return generated
+
+def _write_output(output_dir, html_str):
+    os.makedirs(output_dir, exist_ok=True)
+    with open(f"{output_dir}/generated_output.html", "w", encoding="utf-8") as f:
+        f.write(html_str)
+
+async def generate(topic, content, pdf_template, tone, input_dir=INPUT_PATH, output_dir=OUTPUT_PATH):
     print(f"Processing: {pdf_template.filename}")
     start_time = time.time()
     
@@ -157,27 +322,23 @@ async def generate(topic, content, pdf_template, tone):
     print("✓ PDF converted to HTML")
     
     # Step 2: Process HTML to template with placeholders
-    template, original_lengths = process_html_to_template(pdf_template.filename[:-4])
+    # Parsing and file I/O run in a thread so the shared event loop keeps serving other requests
+    template, original_lengths = await asyncio.to_thread(process_html_to_template, pdf_template.filename[:-4], input_dir)
     print("✓ HTML processed to template")
     
     # Step 3: Extract placeholders
-    placeholders = re.findall(r'\{\{\s*(\w+\d+)\s*\}\}', str(template))
+    placeholders = template.placeholders
     print(f"✓ Found {len(placeholders)} placeholders")
     
     # Step 4: Generate content
-    content_dict = generate_content(placeholders, original_lengths, topic, content, tone)
+    content_dict = await generate_content(placeholders, original_lengths, topic, content, tone)
     print(content_dict)
     print("✓ Content generated")
     
-    # Step 5: Replace placeholders
-    html_str = str(template)
-    for placeholder in placeholders:
-        if placeholder in content_dict:
-            html_str = html_str.replace(f"{{{{ {placeholder} }}}}", content_dict[placeholder])
+    # Step 5: Fill placeholders in one pass
+    html_str = template.render(content_dict)
     
     # Step 6: Save output
-    os.makedirs(OUTPUT_PATH, exist_ok=True)
-    with open(f"{OUTPUT_PATH}/generated_output.html", "w", encoding="utf-8") as f:
-        f.write(BeautifulSoup(html_str, "html.parser").prettify())
+    await asyncio.to_thread(_write_output, output_dir, html_str)
     
     print(f"✓ Complete! Time: {time.time() - start_time:.2f}s")
\ No newline at end of file
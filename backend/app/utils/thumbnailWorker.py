@@ -0,0 +1,92 @@
+import threading
+import traceback
+from collections import OrderedDict
+from app.config import THUMBNAIL_WORKERS
+
+
+class ThumbnailWorker:
+    """
+    Background renderer for deferred save thumbnails.
+
+    Tasks are keyed by project: a save submitted while an earlier save of the same
+    project is still waiting replaces it, so only the latest version is rendered and
+    the superseded one is reported to on_superseded. A project is never rendered by
+    two threads at once. Pending tasks are kept in memory only.
+    """
+
+    def __init__(self, workers=THUMBNAIL_WORKERS):
+        self.workers = workers
+        self._pending = OrderedDict()  # project_id -> task
+        self._running = set()
+        self._condition = threading.Condition()
+        self._handler = None
+        self._on_superseded = None
+        self._threads = []
+        self._stats = {"submitted": 0, "rendered": 0, "superseded": 0, "failed": 0}
+
+    def start(self, handler, on_superseded=None):
+        """
+        Starts the worker threads.
+        handler(task) renders and stores one thumbnail; on_superseded(task) is called
+        for tasks replaced by a newer save of the same project.
+        """
+        self._handler = handler
+        self._on_superseded = on_superseded
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f"thumbnail-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, project_id, task):
+        with self._condition:
+            superseded = self._pending.pop(project_id, None)
+            self._pending[project_id] = task
+            self._stats["submitted"] += 1
+            if superseded:
+                self._stats["superseded"] += 1
+            self._condition.notify()
+
+        if superseded and self._on_superseded:
+            self._safe_call(self._on_superseded, superseded)
+
+    def _next(self):
+        # Oldest waiting project that is not being rendered right now
+        for project_id in self._pending:
+            if project_id not in self._running:
+                self._running.add(project_id)
+                return project_id, self._pending.pop(project_id)
+        return None
+
+    def _loop(self):
+        while True:
+            with self._condition:
+                item = self._next()
+                while item is None:
+                    self._condition.wait()
+                    item = self._next()
+
+            project_id, task = item
+            ok = self._safe_call(self._handler, task)
+
+            with self._condition:
+                self._running.discard(project_id)
+                self._stats["rendered" if ok else "failed"] += 1
+                # A newer save of this project may have been waiting for this render to finish
+                self._condition.notify_all()
+
+    @staticmethod
+    def _safe_call(func, task):
+        try:
+            func(task)
+            return True
+        except Exception as e:
+            print(f"Thumbnail task for project {task.get('project_id')} failed: {e}")
+            traceback.print_exc()
+            return False
+
+    def stats(self):
+        with self._condition:
+            return {**self._stats, "pending": len(self._pending), "running": len(self._running)}
+
+
+thumbnail_worker = ThumbnailWorker()
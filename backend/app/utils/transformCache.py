@@ -0,0 +1,168 @@
+import hashlib
+import random
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+_WHITESPACE = re.compile(r"\s+")
+_PUNCTUATION = re.compile(r"[^\w\s]", re.UNICODE)
+
+
+def normalize(text):
+    """Exact-match normalization: unicode NFC, trimmed, whitespace collapsed."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text or "")).strip()
+
+
+def _loose(text):
+    """Near-duplicate normalization: additionally lowercased and without punctuation."""
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", normalize(text).lower())).strip()
+
+
+class TransformCache:
+    """
+    Cache in front of transformText.
+
+    Keys are the normalized (text, tone, custom prompt). Entries live in an in-process
+    LRU with a TTL; with db_path set they are also written to a SQLite file so other
+    workers can reuse them. With near_duplicates enabled, a miss on the exact key
+    falls back to a second exact index on the loosely normalized text, so text
+    differing only in whitespace, punctuation or case is a hit (in-process entries
+    only). Any other difference, such as a changed number or word, is a miss.
+    """
+
+    def __init__(self, max_entries, ttl, db_path=None, near_duplicates=False):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self.near_duplicates = near_duplicates
+        self._entries = OrderedDict()  # key -> (value, expires_at, loose key)
+        self._loose_index = {}  # loose key -> key of the latest entry with that loose text
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {"hits": 0, "near_hits": 0, "disk_hits": 0, "misses": 0}
+
+        if db_path:
+            conn = self._connect()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS transform_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _context(tone, custom_prompt):
+        # transformText only looks at the custom prompt for the Custom tone
+        prompt = normalize(custom_prompt) if tone == "Custom" and custom_prompt else ""
+        return f"{normalize(tone).lower()}\x1f{prompt}"
+
+    def _key(self, text, context):
+        return hashlib.sha256(f"{context}\x1e{normalize(text)}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _loose_key(text, context):
+        return hashlib.sha256(f"{context}\x1e{_loose(text)}".encode("utf-8")).hexdigest()
+
+    def _remove(self, key):
+        value, expires_at, loose_key = self._entries.pop(key)
+        if loose_key and self._loose_index.get(loose_key) == key:
+            del self._loose_index[loose_key]
+
+    def _store(self, key, value, expires_at, context, text):
+        loose_key = self._loose_key(text, context) if self.near_duplicates else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at, loose_key)
+            if loose_key:
+                self._loose_index[loose_key] = key
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, text, tone, custom_prompt=None):
+        context = self._context(tone, custom_prompt)
+        key = self._key(text, context)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > now:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[0]
+            if entry:
+                self._remove(key)
+
+        if self.db_path:
+            row = self._connect().execute(
+                "SELECT value, expires_at FROM transform_cache WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row:
+                self._store(key, row[0], row[1], context, text)
+                self._count("disk_hits")
+                return row[0]
+
+        if self.near_duplicates:
+            value = self._near_duplicate(text, context, now)
+            if value is not None:
+                self._count("near_hits")
+                return value
+
+        self._count("misses")
+        return None
+
+    def _near_duplicate(self, text, context, now):
+        loose_key = self._loose_key(text, context)
+        with self._lock:
+            key = self._loose_index.get(loose_key)
+            if key is None:
+                return None
+            value, expires_at, _ = self._entries[key]
+            if expires_at <= now:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, text, tone, custom_prompt, value):
+        context = self._context(tone, custom_prompt)
+        key = self._key(text, context)
+        expires_at = time.time() + self.ttl
+        self._store(key, value, expires_at, context, text)
+
+        if self.db_path:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO transform_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at)
+            )
+            # Cheap, probabilistic purge of expired rows so the file does not grow forever
+            if random.random() < 0.01:
+                conn.execute("DELETE FROM transform_cache WHERE expires_at <= ?", (time.time(),))
+
+    def stats(self):
+        with self._lock:
+            lookups = sum(self._stats.values())
+            hits = lookups - self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(hits / lookups, 3) if lookups else None,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries
+            }
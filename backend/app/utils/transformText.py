@@ -1,26 +1,172 @@
-from openai import OpenAI
-from app.config import OPENROUTER_API_KEY
+import asyncio
+import json
+from app.utils.llmClients import get_async_openrouter_client
+from app.utils.transformCache import TransformCache
+from app.utils.eventLoop import run_async
+from app.config import (
+    TRANSFORM_BATCH_MAX_CHARS,
+    TRANSFORM_BATCH_CONCURRENCY,
+    TRANSFORM_CACHE_MAX_ENTRIES,
+    TRANSFORM_CACHE_TTL,
+    TRANSFORM_CACHE_DB,
+    TRANSFORM_CACHE_NEAR_DUPLICATES
+)
 
-client = OpenAI(
-    base_url="https://openrouter.ai/api/v1",
-    api_key=OPENROUTER_API_KEY,
+transform_cache = TransformCache(
+    TRANSFORM_CACHE_MAX_ENTRIES,
+    TRANSFORM_CACHE_TTL,
+    db_path=TRANSFORM_CACHE_DB,
+    near_duplicates=TRANSFORM_CACHE_NEAR_DUPLICATES
 )
 
+MODEL = "meta-llama/llama-3.3-8b-instruct:free"
+
+def _single_prompt(text, tone, custom_prompt):
+    if tone == 'Custom' and custom_prompt:
+        return f"""{custom_prompt}\n\nText:\n{text}\n\nRespond only with the rewritten version."""
+    return f"""Convert the following text to a {tone} tone:\n\n"{text}"\n\nRespond only with the rewritten version."""
+
+
+async def transformTextAsync(text, tone, custom_prompt=None):
+    cached = transform_cache.get(text, tone, custom_prompt)
+    if cached is not None:
+        return cached
+
+    response = await get_async_openrouter_client().chat.completions.create(
+        model=MODEL,
+        messages=[{"role": "user", "content": _single_prompt(text, tone, custom_prompt)}],
+        timeout=30
+    )
+
+    # Remove surrounding quotes if present
+    transformed = _strip_quotes(response.choices[0].message.content)
+
+    transform_cache.set(text, tone, custom_prompt, transformed)
+    return transformed
+
+
 def transformText(text, tone, custom_prompt=None):
+    """Synchronous transformTextAsync, run on the worker's shared event loop."""
+    return run_async(transformTextAsync(text, tone, custom_prompt))
+
+
+def _strip_quotes(text):
+    text = text.strip()
+    if text.startswith(("'", '"')) and text.endswith(("'", '"')):
+        text = text[1:-1]
+    return text
+
+
+def _pack_blocks(blocks):
+    """Groups blocks into chunks whose combined text fits in one prompt."""
+    chunks, current, size = [], {}, 0
+    for block_id, text in blocks.items():
+        if current and size + len(text) > TRANSFORM_BATCH_MAX_CHARS:
+            chunks.append(current)
+            current, size = {}, 0
+        current[block_id] = text
+        size += len(text)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _batch_prompt(chunk, tone, custom_prompt):
     if tone == 'Custom' and custom_prompt:
-        prompt = f"""{custom_prompt}\n\nText:\n{text}\n\nRespond only with the rewritten version."""
+        instruction = custom_prompt
     else:
-        prompt = f"""Convert the following text to a {tone} tone:\n\n"{text}"\n\nRespond only with the rewritten version."""
+        instruction = f"Convert each text to a {tone} tone."
 
-    response = client.chat.completions.create(
-        model="meta-llama/llama-3.3-8b-instruct:free",
-        messages=[{"role": "user", "content": prompt}]
-    )
+    return f"""{instruction}
 
-    transformed = response.choices[0].message.content.strip()
+The input is a JSON object mapping block IDs to texts. Rewrite every text independently.
+Return ONLY a JSON object with exactly the same IDs mapped to the rewritten texts, nothing else.
+
+{json.dumps(chunk, ensure_ascii=False)}"""
+
+
+async def _transform_chunk(client, semaphore, chunk, tone, custom_prompt):
+    async with semaphore:
+        try:
+            response = await client.chat.completions.create(
+                model=MODEL,
+                messages=[{"role": "user", "content": _batch_prompt(chunk, tone, custom_prompt)}],
+                timeout=60
+            )
+            text = response.choices[0].message.content
+            json_start, json_end = text.find('{'), text.rfind('}') + 1
+            generated = json.loads(text[json_start:json_end]) if json_start != -1 else {}
+        except Exception as e:
+            print(f"Batch transform chunk failed: {e}")
+            generated = {}
+
+    return {
+        block_id: _strip_quotes(generated[block_id])
+        for block_id in chunk
+        if isinstance(generated.get(block_id), str) and generated[block_id].strip()
+    }
+
+
+async def _transform_batch_async(pending, tone, custom_prompt):
+    client = get_async_openrouter_client()
+    semaphore = asyncio.Semaphore(TRANSFORM_BATCH_CONCURRENCY)
+    chunks = _pack_blocks(pending)
+
+    results = {}
+    for chunk_result in await asyncio.gather(*(_transform_chunk(client, semaphore, chunk, tone, custom_prompt) for chunk in chunks)):
+        results.update(chunk_result)
+
+    # Blocks the model dropped or mangled fall back to the single-text path
+    missing = [block_id for block_id in pending if block_id not in results]
+
+    async def single(block_id):
+        async with semaphore:
+            try:
+                return block_id, await transformTextAsync(pending[block_id], tone, custom_prompt)
+            except Exception as e:
+                print(f"Transform fallback failed for block {block_id}: {e}")
+                return block_id, None
+
+    for block_id, transformed in await asyncio.gather(*(single(block_id) for block_id in missing)):
+        if transformed is not None:
+            results[block_id] = transformed
+
+    # Every block that needed the fallback cost one more LLM call
+    return results, len(chunks) + len(missing)
+
+
+async def transformTextBatchAsync(blocks, tone, custom_prompt=None):
+    """
+    Rewrites many text blocks with as few LLM calls as possible.
+
+    Args:
+        blocks: dict mapping block ID to text
+        tone: target tone, as for transformText
+        custom_prompt: instruction used when tone is 'Custom'
+
+    Returns:
+        tuple: (dict of block ID -> rewritten text, list of IDs that failed, number of LLM calls made,
+                packed chunks plus per-block fallbacks)
+    """
+    results, pending = {}, {}
+    for block_id, text in blocks.items():
+        cached = transform_cache.get(text, tone, custom_prompt)
+        if cached is not None:
+            results[block_id] = cached
+        else:
+            pending[block_id] = text
+
+    llm_calls = 0
+    if pending:
+        generated, llm_calls = await _transform_batch_async(pending, tone, custom_prompt)
+        for block_id, transformed in generated.items():
+            transform_cache.set(pending[block_id], tone, custom_prompt, transformed)
+        results.update(generated)
+
+    failed = [block_id for block_id in blocks if block_id not in results]
+    return results, failed, llm_calls
 
-    # Remove surrounding quotes if present
-    if transformed.startswith(("'", '"')) and transformed.endswith(("'", '"')):
-        transformed = transformed[1:-1]
 
-    return transformed
\ No newline at end of file
+def transformTextBatch(blocks, tone, custom_prompt=None):
+    """Synchronous transformTextBatchAsync, run on the worker's shared event loop."""
+    return run_async(transformTextBatchAsync(blocks, tone, custom_prompt))
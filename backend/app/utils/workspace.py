@@ -0,0 +1,86 @@
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from app.config import WORKSPACES_PATH, WORKSPACE_TTL_SECONDS
+
+# Every generation gets its own directory: WORKSPACES_PATH/<user_id>/<key>/
+# holding converted_output.html (PDF flow) and generated_output.html.
+GENERATED_FILENAME = "generated_output.html"
+
+_KEY_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+_SAFE_USER_PATTERN = re.compile(r"^[0-9A-Za-z_-]+$")
+
+_cleanup_lock = threading.Lock()
+_last_cleanup = 0.0
+
+
+def _user_dir(user_id):
+    user_id = str(user_id)
+    if not _SAFE_USER_PATTERN.match(user_id):
+        raise ValueError("Invalid user id for workspace")
+    return os.path.join(WORKSPACES_PATH, user_id)
+
+
+def create_workspace(user_id):
+    """
+    Creates a fresh workspace for one generation.
+
+    Returns:
+        tuple: (key, path) where key identifies the workspace in URLs
+    """
+    cleanup_expired_workspaces()
+
+    key = uuid.uuid4().hex
+    path = os.path.join(_user_dir(user_id), key)
+    os.makedirs(path, exist_ok=True)
+    return key, path
+
+
+def get_workspace_path(user_id, key):
+    """Returns the directory of an existing workspace, or None if the key is unknown for this user."""
+    if not key or not _KEY_PATTERN.match(key):
+        return None
+    path = os.path.join(_user_dir(user_id), key)
+    return path if os.path.isdir(path) else None
+
+
+def cleanup_expired_workspaces(ttl=WORKSPACE_TTL_SECONDS, force=False):
+    """
+    Removes workspaces older than ttl seconds.
+    Runs at most once a minute unless forced, so it can be called on every create.
+    """
+    global _last_cleanup
+
+    now = time.time()
+    if not force and now - _last_cleanup < 60:
+        return 0
+    if not _cleanup_lock.acquire(blocking=False):
+        return 0
+
+    removed = 0
+    try:
+        _last_cleanup = now
+        if not os.path.isdir(WORKSPACES_PATH):
+            return 0
+
+        for user_entry in os.scandir(WORKSPACES_PATH):
+            if not user_entry.is_dir():
+                continue
+            for entry in os.scandir(user_entry.path):
+                try:
+                    if entry.is_dir() and now - entry.stat().st_mtime > ttl:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+            try:
+                os.rmdir(user_entry.path)  # only succeeds once the user has no workspaces left
+            except OSError:
+                pass
+    finally:
+        _cleanup_lock.release()
+
+    return removed
@@ -0,0 +1,91 @@
+"""
+ASGI entry point.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 4
+
+Requests for async views (the LLM-bound routes, saves, duplicates) are dispatched
+natively: the request body is read, the handler is awaited on the server's own event
+loop and the response is sent from there, so a slow LLM call holds no thread. Every
+other route runs through a2wsgi in a thread pool of ASGI_WSGI_THREADS threads per
+worker. The event loop is attached as the worker loop (app/utils/eventLoop.py), so
+sync code that calls run_async() shares it and its async clients (LLM, Supabase).
+run.py still serves the app with the Flask development server.
+"""
+import asyncio
+from io import BytesIO
+from a2wsgi import WSGIMiddleware
+from a2wsgi.wsgi import build_environ
+from app import create_app
+from app.config import ASGI_WSGI_THREADS
+from app.utils.eventLoop import worker_loop
+
+flask_app = create_app()
+wsgi = WSGIMiddleware(flask_app, workers=ASGI_WSGI_THREADS)
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                worker_loop.attach(asyncio.get_running_loop())
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # Servers started with --lifespan off never send startup
+    if worker_loop.loop is not asyncio.get_running_loop():
+        worker_loop.attach(asyncio.get_running_loop())
+
+    if scope["type"] == "http":
+        environ = build_environ(scope, None)
+        if flask_app.is_async_view(environ):
+            await serve_async_view(environ, receive, send)
+            return
+    await wsgi(scope, receive, send)
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+async def serve_async_view(environ, receive, send):
+    """Awaits an async Flask view on the running loop and sends its (possibly streamed) response."""
+    body = await read_body(receive)
+    if body is None:
+        return  # client went away before the request was complete
+    environ["wsgi.input"] = BytesIO(body)
+    environ["CONTENT_LENGTH"] = str(len(body))
+
+    async def send_response(response):
+        await send({
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": [(name.lower().encode("latin1"), value.encode("latin1")) for name, value in response.headers.items()]
+        })
+        response_body = response.response
+        try:
+            if hasattr(response_body, "__aiter__"):
+                async for chunk in response_body:
+                    await send({"type": "http.response.body", "body": chunk.encode("utf-8") if isinstance(chunk, str) else chunk, "more_body": True})
+            else:
+                # Buffered bodies are sent as they are; anything else (files, generators) is read in a worker thread
+                chunks = response.iter_encoded() if response.is_sequence else await asyncio.to_thread(list, response.iter_encoded())
+                for chunk in chunks:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        finally:
+            if hasattr(response_body, "aclose"):
+                await response_body.aclose()
+            else:
+                response.close()
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    await flask_app.dispatch_async(environ, send_response)
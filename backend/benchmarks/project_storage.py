@@ -0,0 +1,106 @@
+"""
+Benchmark of project JSON storage encodings (upload_project / projectStore).
+
+Compares the previous pretty-printed format with compact serialization, gzip at
+several levels and zstd (when zstandard is installed): stored size, encode time
+and decode time.
+
+Usage (from backend/):
+    python -m benchmarks.project_storage [exported_project.json ...]
+
+Without arguments, GrapesJS-shaped projects of several sizes are synthesized.
+Editor payloads can be exported from the browser console with
+JSON.stringify(editor.getProjectData()).
+"""
+import gzip
+import json
+import os
+import sys
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def make_project(sections):
+    """Builds a project shaped like GrapesJS getProjectData(): nested components, styles and assets."""
+    components = []
+    for index in range(sections):
+        components.append({
+            "tagName": "section",
+            "attributes": {"id": f"section-{index}", "class": "newsletter-section"},
+            "components": [
+                {"tagName": "h2", "type": "text", "classes": ["section-title"], "components": [{"type": "textnode", "content": f"Section {index} headline"}]},
+                {"tagName": "p", "type": "text", "classes": ["body-text"], "components": [{"type": "textnode", "content": f"Paragraph {index} of the newsletter body, describing this week's update in a few sentences. " * 3}]},
+                {"type": "image", "attributes": {"src": f"/api/images/{index:064x}", "alt": f"Illustration {index}"}, "classes": ["section-image"]},
+                {"tagName": "a", "type": "link", "attributes": {"href": "https://example.com/read-more"}, "components": [{"type": "textnode", "content": "Read more"}]}
+            ]
+        })
+
+    styles = [
+        {"selectors": [f"#section-{index}"], "style": {"padding": "24px", "margin": "0 auto", "background-color": "#ffffff", "font-family": "Helvetica, Arial, sans-serif"}}
+        for index in range(sections)
+    ]
+    return {
+        "assets": [{"type": "image", "src": f"/api/images/{index:064x}", "height": 400, "width": 600} for index in range(sections)],
+        "styles": styles,
+        "pages": [{"frames": [{"component": {"type": "wrapper", "components": components}}], "id": "main-page"}],
+        "symbols": [],
+        "dataSources": []
+    }
+
+
+def timed(func, repeat=5):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def encodings():
+    yield "pretty (old)", lambda d: json.dumps(d, indent=2).encode("utf-8"), json.loads
+    yield "compact", lambda d: json.dumps(d, separators=(",", ":")).encode("utf-8"), json.loads
+    for level in (1, 6, 9):
+        yield (
+            f"compact+gzip-{level}",
+            lambda d, level=level: gzip.compress(json.dumps(d, separators=(",", ":")).encode("utf-8"), compresslevel=level, mtime=0),
+            lambda raw: json.loads(gzip.decompress(raw))
+        )
+    if zstandard is not None:
+        for level in (3, 10, 19):
+            yield (
+                f"compact+zstd-{level}",
+                lambda d, level=level: zstandard.ZstdCompressor(level=level).compress(json.dumps(d, separators=(",", ":")).encode("utf-8")),
+                lambda raw: json.loads(zstandard.ZstdDecompressor().decompressobj().decompress(raw))
+            )
+
+
+def report(label, project):
+    print(f"\n{label}")
+    print(f"{'encoding':>18} {'size KB':>9} {'ratio':>6} {'encode ms':>10} {'decode ms':>10}")
+    baseline = None
+    for name, encode, decode in encodings():
+        encode_time, raw = timed(lambda: encode(project))
+        decode_time, _ = timed(lambda: decode(raw))
+        baseline = baseline or len(raw)
+        print(f"{name:>18} {len(raw) / 1024:>9.1f} {baseline / len(raw):>5.1f}x {encode_time * 1000:>10.2f} {decode_time * 1000:>10.2f}")
+
+
+def main(paths):
+    if zstandard is None:
+        print("zstandard is not installed; zstd rows are skipped")
+    if paths:
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                report(os.path.basename(path), json.load(f))
+    else:
+        for sections in (10, 50, 200, 800):
+            report(f"synthetic project, {sections} sections", make_project(sections))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,87 @@
+"""
+Benchmark of the PDF-template processing step (templateUpload) on synthetic
+multi-page ConvertAPI-style HTML.
+
+Compares the previous pipeline (html.parser, str.replace per placeholder,
+prettify re-parse) with the compiled single-pass template.
+
+Usage (from backend/):
+    python -m benchmarks.template_engine [pages ...]
+"""
+import os
+import re
+import sys
+import time
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.templateUpload import compile_template, PARSER  # noqa: E402
+
+
+def make_converted_pdf(pages, paragraphs_per_page=12):
+    """Builds HTML shaped like ConvertAPI output: one div per page, classed <p> with nested spans."""
+    body = []
+    for page in range(pages):
+        body.append(f'<div class="page" id="page{page}" style="width:595pt;height:842pt;position:relative">')
+        body.append(f'<p class="p heading-1" style="top:40pt"><span class="s1">Section {page} heading</span></p>')
+        for index in range(paragraphs_per_page):
+            kind = "body-text" if index % 4 else "heading-2"
+            body.append(
+                f'<p class="p {kind}" style="top:{60 + index * 20}pt;left:40pt">'
+                f'<span class="s2">Paragraph {index} on page {page} with </span>'
+                f'<span class="s3">some styled text that the template keeps.</span></p>'
+            )
+        body.append('<img src="data:image/png;base64,iVBORw0KGgo=" style="width:120pt"/></div>')
+    return f"<!DOCTYPE html><html><head><style>.p{{position:absolute}}</style></head><body>{''.join(body)}</body></html>"
+
+
+def legacy_pipeline(html):
+    soup = BeautifulSoup(html, "html.parser")
+    counter = {}
+    for p in soup.find_all('p'):
+        if p.get('class'):
+            class_name = p.get('class')[1] if len(p.get('class')) > 1 else p.get('class')[0]
+            kind = 'heading' if re.match(r'heading-\d+', class_name) else ('body' if 'body' in class_name else None)
+            if kind:
+                counter[kind] = counter.get(kind, 0) + 1
+                for span in p.find_all('span'):
+                    span.unwrap()
+                p.string = f"{{{{ {kind}{counter[kind]} }}}}"
+
+    placeholders = re.findall(r'\{\{\s*(\w+\d+)\s*\}\}', str(soup))
+    content = {name: f"Generated text for {name}" for name in placeholders}
+    html_str = str(soup)
+    for placeholder in placeholders:
+        html_str = html_str.replace(f"{{{{ {placeholder} }}}}", content[placeholder])
+    return BeautifulSoup(html_str, "html.parser").prettify()
+
+
+def compiled_pipeline(html):
+    template, _ = compile_template(html)
+    content = {name: f"Generated text for {name}" for name in template.placeholders}
+    return template.render(content)
+
+
+def timed(func, html, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(html)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(page_counts):
+    print(f"parser backend for compiled pipeline: {PARSER}")
+    print(f"{'pages':>6} {'size KB':>8} {'placeholders':>12} {'legacy s':>9} {'compiled s':>10} {'speedup':>8}")
+    for pages in page_counts:
+        html = make_converted_pdf(pages)
+        placeholders = len(compile_template(html)[0].placeholders)
+        legacy = timed(legacy_pipeline, html)
+        compiled = timed(compiled_pipeline, html)
+        print(f"{pages:>6} {len(html) // 1024:>8} {placeholders:>12} {legacy:>9.3f} {compiled:>10.3f} {legacy / compiled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1, 5, 20, 50])
@@ -0,0 +1,21 @@
+from app.utils.htmlRepair import validate_html, repair_html
+
+
+def test_header_element_is_not_a_document_wrapper():
+    html = "<style>.top { color: red; }</style><header class=\"top\"><h1>Weekly</h1></header><section><p>Body</p></section>"
+    assert validate_html(html) == []
+    repaired, _ = repair_html(html)
+    assert "<header" in repaired and validate_html(repaired) == []
+
+
+def test_document_wrappers_are_reported_and_removed():
+    html = "<html><head><title>x</title><style>p { margin: 0; }</style></head><body><header>Hi</header><p>Body</p></body></html>"
+    assert "document wrapper tags present" in validate_html(html)
+    repaired, _ = repair_html(html)
+    assert validate_html(repaired) == []
+    assert "<header>Hi</header>" in repaired
+
+
+def test_lone_head_tag_is_removed():
+    repaired, _ = repair_html("<head><style>p { margin: 0; }</style><p>Body</p>")
+    assert validate_html(repaired) == []
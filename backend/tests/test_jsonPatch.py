@@ -0,0 +1,52 @@
+import copy
+import json
+import random
+
+from app.utils.jsonPatch import diff, apply_patch
+
+
+def _round_trip(old, new):
+    patched = apply_patch(copy.deepcopy(old), diff(old, new))
+    # json.dumps keeps 1, 1.0 and true apart, unlike ==
+    assert json.dumps(patched, sort_keys=True) == json.dumps(new, sort_keys=True)
+
+
+def test_scalar_type_changes_are_not_dropped():
+    cases = [
+        ({"a": 1}, {"a": True}),
+        ({"a": 0}, {"a": False}),
+        ({"a": True}, {"a": 1}),
+        ({"a": 1}, {"a": 1.0}),
+        ({"a": {"b": [1, 0]}}, {"a": {"b": [True, False]}}),
+        ({"a": [{"x": 2.0}]}, {"a": [{"x": 2}]}),
+        ([1, 2, 3], [1, True, 3]),
+    ]
+    for old, new in cases:
+        assert diff(old, new), (old, new)
+        _round_trip(old, new)
+
+
+def test_unchanged_document_has_no_operations():
+    doc = {"a": [1, True, 1.5, None, {"b": "c"}], "d/e~f": {}}
+    assert diff(doc, copy.deepcopy(doc)) == []
+
+
+def _random_value(rng, depth):
+    kind = rng.randrange(7 if depth < 3 else 4)
+    if kind == 0:
+        return rng.choice([0, 1, 2])
+    if kind == 1:
+        return rng.choice([True, False])
+    if kind == 2:
+        return rng.choice([0.0, 1.0, 2.5])
+    if kind == 3:
+        return rng.choice(["", "a", "b/c", "~d", None])
+    if kind in (4, 5):
+        return [_random_value(rng, depth + 1) for _ in range(rng.randrange(5))]
+    return {rng.choice(["a", "b", "c/d", "e~f"]): _random_value(rng, depth + 1) for _ in range(rng.randrange(4))}
+
+
+def test_random_round_trips():
+    rng = random.Random(1234)
+    for _ in range(2000):
+        _round_trip({"root": _random_value(rng, 0)}, {"root": _random_value(rng, 0)})
@@ -1,5 +1,5 @@
 import React, { useEffect, useState, useCallback, useRef } from 'react';
-import { useNavigate, useParams } from 'react-router-dom';
+import { useNavigate, useParams, useSearchParams } from 'react-router-dom';
 import StudioEditor from '@grapesjs/studio-sdk/react';
 import '@grapesjs/studio-sdk/style';
 import { canvasAbsoluteMode } from '@grapesjs/studio-sdk-plugins';
@@ -279,6 +279,8 @@ const Label = ({ children, ...props }) => (
 
 function Editor() {
   const { id } = useParams();
+  const [searchParams] = useSearchParams();
+  const outputKey = searchParams.get('output');
   const navigate = useNavigate();
   const [editor, setEditor] = useState(null);
   const [error, setError] = useState(null);
@@ -457,7 +459,18 @@ function Editor() {
         }
       } else {
           console.log("Loading new project template");
-          const res = await fetch('/api/generated_output.html');
+          let res;
+          if (outputKey) {
+            const authToken = await getAuthToken();
+            if (!authToken) {
+              return;
+            }
+            res = await fetch(`/api/generated/${outputKey}`, {
+              headers: { 'Authorization': `Bearer ${authToken}` },
+            });
+          } else {
+            res = await fetch('/api/generated_output.html');
+          }
           if (!res.ok) throw new Error(`HTTP error! status: ${res.status}`);
           const html = await res.text();
           editorInstance.setComponents(html);
@@ -478,7 +491,7 @@ function Editor() {
         setLoading(false);
         setShowProjectLoadingOverlay(false);
       }
-  }, [id, getAuthToken, navigate, showToast]);
+  }, [id, outputKey, getAuthToken, navigate, showToast]);
 
 
   const handleSaveProject = useCallback(async () => {
@@ -817,12 +830,23 @@ console.log(`LocalStorage size: ${(total / 1024).toFixed(2)} KB`);
         throw new Error(errorData.error || 'Image generation failed');
       }
 
-      const { image_base64, mime_type } = await response.json();
-      if (!image_base64 || !mime_type) {
+      const { image_url, mime_type } = await response.json();
+      if (!image_url || !mime_type) {
         throw new Error('Invalid image data received');
       }
 
-      const dataUrl = `data:${mime_type};base64,${image_base64}`;
+      // Fetch the binary image and embed it, so saved projects do not depend on the server cache
+      const imageResponse = await fetch(image_url);
+      if (!imageResponse.ok) {
+        throw new Error('Failed to download generated image');
+      }
+      const imageBlob = await imageResponse.blob();
+      const dataUrl = await new Promise((resolve, reject) => {
+        const reader = new FileReader();
+        reader.onloadend = () => resolve(reader.result);
+        reader.onerror = reject;
+        reader.readAsDataURL(imageBlob);
+      });
       selectedImageComponent.addAttributes({ src: dataUrl });
 
       closeImageModal();
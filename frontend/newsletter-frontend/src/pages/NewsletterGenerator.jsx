@@ -71,6 +71,19 @@ const NewsletterGenerator = () => {
     setSelectedFile(file);
   };
 
+  // Polls a background generation job until it finishes
+  const waitForJob = async (resultUrl, authToken) => {
+    while (true) {
+      await new Promise(resolve => setTimeout(resolve, 2000));
+      const res = await fetch(resultUrl, {
+        headers: { 'Authorization': `Bearer ${authToken}` }
+      });
+      if (res.status !== 202) {
+        return { response: res, result: await res.json() };
+      }
+    }
+  };
+
   const handleSubmit = async () => {
     setIsLoading(true);
     setError('');
@@ -90,12 +103,13 @@ const NewsletterGenerator = () => {
       data.append('topic', formData.topic);
       data.append('tone', formData.tone || 'Professional');
       data.append('user_prompt', formData.user_prompt);
+      data.append('mode', 'job');
 
       if (selectedFile) {
         data.append('pdf_file', selectedFile);
       }
 
-      const response = await fetch('/api/generate', {
+      let response = await fetch('/api/generate', {
         method: 'POST',
   
         headers: {
@@ -112,7 +126,11 @@ const NewsletterGenerator = () => {
           return;
       }
 
-      const result = await response.json();
+      let result = await response.json();
+
+      if (response.status === 202 && result.job_id) {
+        ({ response, result } = await waitForJob(result.result_url, authToken));
+      }
 
       if (response.ok && result.success) {
         showToast(result.message, 'success'); 
@@ -2,6 +2,20 @@ import React, { useState, useEffect, useCallback } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import { supabase } from '../supabaseClient.js'; // Import your Supabase client
 
+// How often the page re-checks versions whose thumbnail is still being rendered
+const THUMBNAIL_POLL_INTERVAL_MS = 4000;
+
+const toVersionRow = (item) => ({
+  id: item.id, // Supabase row ID (unique for each version)
+  projectId: item.project_id, // Common project ID for all versions
+  name: item.project_name || 'Untitled Newsletter',
+  version: item.version,
+  status: item.status,
+  lastEdited: new Date(item.updated_at || item.created_at).toLocaleString(),
+  image_path: item.image_path,
+  thumbnailPending: Boolean(item.thumbnail_pending)
+});
+
 const NewsletterVersionsPage = () => {
   const { projectId } = useParams(); // Get projectId from the URL
   const navigate = useNavigate();
@@ -9,6 +23,8 @@ const NewsletterVersionsPage = () => {
   const [versions, setVersions] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null); // Cursor of the next (older) page of versions
+  const [loadingMore, setLoadingMore] = useState(false);
 
   // State for delete confirmation modal
   const [showDeleteModal, setShowDeleteModal] = useState(false);
@@ -52,7 +68,8 @@ const NewsletterVersionsPage = () => {
   }, [navigate, displayToast]); // Dependencies for useCallback
 
   // Function to fetch newsletter versions
-  const fetchNewsletterVersions = useCallback(async () => {
+  // `background` refreshes (thumbnail polling) keep the table on screen instead of the loading view
+  const fetchNewsletterVersions = useCallback(async (background = false) => {
     if (!projectId) {
       setError("No project ID provided in URL.");
       setLoading(false);
@@ -61,7 +78,9 @@ const NewsletterVersionsPage = () => {
 
     console.log(`Fetching all versions for project ID: ${projectId}`);
     try {
-      setLoading(true);
+      if (!background) {
+        setLoading(true);
+      }
       setError(null);
 
       // --- AUTH FIX: Get token using Supabase SDK ---
@@ -95,15 +114,14 @@ const NewsletterVersionsPage = () => {
          throw new Error(data.error || 'Failed to fetch newsletter versions.');
       }
 
-      setVersions(data.versions.map(item => ({
-        id: item.id, // Supabase row ID (unique for each version)
-        projectId: item.project_id, // Common project ID for all versions
-        name: item.project_name || 'Untitled Newsletter',
-        version: item.version,
-        status: item.status,
-        lastEdited: new Date(item.updated_at || item.created_at).toLocaleString(),
-        image_path: item.image_path
-      })));
+      if (background) {
+        // Only refresh the rows of the first page, keeping any older pages already loaded
+        const fresh = Object.fromEntries(data.versions.map(item => [item.id, toVersionRow(item)]));
+        setVersions(prev => prev.map(version => fresh[version.id] || version));
+      } else {
+        setVersions(data.versions.map(toVersionRow));
+        setNextCursor(data.next_cursor || null);
+      }
 
     } catch (err) {
       console.error('Error fetching newsletter versions:', err);
@@ -119,6 +137,69 @@ const NewsletterVersionsPage = () => {
     fetchNewsletterVersions();
   }, [fetchNewsletterVersions]); // fetchNewsletterVersions is already useCallback'd and has its own deps
 
+  // Thumbnails of recent saves may still be rendering in the background; poll until they are ready
+  const hasPendingThumbnails = versions.some(version => version.thumbnailPending);
+  useEffect(() => {
+    if (!hasPendingThumbnails) {
+      return undefined;
+    }
+    const timer = setTimeout(() => fetchNewsletterVersions(true), THUMBNAIL_POLL_INTERVAL_MS);
+    return () => clearTimeout(timer);
+  }, [hasPendingThumbnails, versions, fetchNewsletterVersions]);
+
+  // Appends the next (older) page of versions
+  const loadOlderVersions = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const authToken = await getAuthToken();
+      if (!authToken) return;
+
+      const response = await fetch(`/api/newsletters/${projectId}/versions?cursor=${encodeURIComponent(nextCursor)}`, {
+        headers: { 'Authorization': `Bearer ${authToken}` }
+      });
+      const data = await response.json().catch(() => ({}));
+      if (!response.ok || data.success === false) {
+        throw new Error(data.error || `Failed to fetch older versions: ${response.statusText}`);
+      }
+
+      setVersions(prev => [...prev, ...data.versions.map(toVersionRow)]);
+      setNextCursor(data.next_cursor || null);
+    } catch (err) {
+      console.error('Error fetching older versions:', err);
+      displayToast(`Error: ${err.message}`, 'error');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Summarizes what changed since the previous version, computed server-side (no snapshot downloads)
+  const showChanges = async (version) => {
+    try {
+      const authToken = await getAuthToken();
+      if (!authToken) return;
+
+      const response = await fetch(`/api/newsletters/${projectId}/diff?from=${version - 1}&to=${version}`, {
+        headers: { 'Authorization': `Bearer ${authToken}` }
+      });
+      const data = await response.json().catch(() => ({}));
+      if (!response.ok || data.success === false) {
+        throw new Error(data.error || `Failed to compare versions: ${response.statusText}`);
+      }
+
+      const { add, remove, replace } = data.summary;
+      displayToast(
+        add + remove + replace === 0
+          ? `Version ${version} has no changes from version ${version - 1}.`
+          : `Version ${version} vs ${version - 1}: ${add} added, ${remove} removed, ${replace} changed.`,
+        'success'
+      );
+    } catch (err) {
+      console.error('Error comparing versions:', err);
+      displayToast(`Error: ${err.message}`, 'error');
+    }
+  };
+
   // Effect to hide toast after a few seconds
   useEffect(() => {
     let timer;
@@ -147,6 +228,9 @@ const NewsletterVersionsPage = () => {
         setNewsletterToDelete(versionId);
         setShowDeleteModal(true);
         break;
+      case 'Changes':
+        showChanges(versions.find(version => version.id === versionId).version);
+        break;
       default:
         console.log(`${action} action clicked for version ID: ${versionId}`);
     }
@@ -231,6 +315,7 @@ const NewsletterVersionsPage = () => {
       case 'Preview':
       case 'View': return { ...baseStyle, backgroundColor: '#8b5cf6', color: '#ffffff' };
       case 'Delete': return { ...baseStyle, backgroundColor: '#ef4444', color: '#ffffff' };
+      case 'Changes': return { ...baseStyle, backgroundColor: '#0d9488', color: '#ffffff' };
       default: return { ...baseStyle, backgroundColor: '#6b7280', color: '#ffffff' };
     }
   };
@@ -346,6 +431,19 @@ const NewsletterVersionsPage = () => {
       objectFit: 'cover',
       border: '1px solid #404040'
     },
+    thumbnailPending: {
+      width: '80px',
+      height: '60px',
+      borderRadius: '6px',
+      border: '1px dashed #404040',
+      backgroundColor: '#262626',
+      color: '#a3a3a3',
+      fontSize: '11px',
+      display: 'flex',
+      alignItems: 'center',
+      justifyContent: 'center',
+      animation: 'pulse 1.5s ease-in-out infinite',
+    },
     modalOverlay: {
       position: 'fixed',
       top: 0,
@@ -472,6 +570,7 @@ const NewsletterVersionsPage = () => {
       'Preview': '#7c3aed',
       'View': '#7c3aed',
       'Delete': '#dc2626',
+      'Changes': '#0f766e',
       'Back': '#3f3f46' // For back button
     }[action] || style.backgroundColor; // Fallback to base if no hover defined
 
@@ -619,6 +718,8 @@ const NewsletterVersionsPage = () => {
                           style={styles.thumbnail}
                           onError={(e) => { e.target.onerror = null; e.target.src = 'https://placehold.co/80x60/374151/ffffff?text=No+Img'; }}
                         />
+                      ) : version.thumbnailPending ? (
+                        <div style={styles.thumbnailPending} title="Preview is being rendered">Rendering…</div>
                       ) : (
                         <img src="https://placehold.co/80x60/374151/ffffff?text=No+Img" alt="No Preview" style={styles.thumbnail} />
                       )}
@@ -641,6 +742,16 @@ const NewsletterVersionsPage = () => {
                         >
                           Preview
                         </button>
+                        {version.version > 1 && (
+                          <button
+                            onClick={() => handleActionClick('Changes', version.id)}
+                            style={getActionButtonStyle('Changes')}
+                            onMouseEnter={(e) => applyHoverStyle(e, 'Changes')}
+                            onMouseLeave={(e) => removeHoverStyle(e, 'Changes')}
+                          >
+                            Changes
+                          </button>
+                        )}
                         <button
                           onClick={() => handleActionClick('Delete', version.id)}
                           style={getActionButtonStyle('Delete')}
@@ -660,6 +771,19 @@ const NewsletterVersionsPage = () => {
               No versions found for this newsletter.
             </p>
           )}
+          {nextCursor && (
+            <div style={{ display: 'flex', justifyContent: 'center', paddingTop: '8px' }}>
+              <button
+                onClick={loadOlderVersions}
+                disabled={loadingMore}
+                style={styles.backButton}
+                onMouseEnter={(e) => applyHoverStyle(e, 'Back')}
+                onMouseLeave={(e) => removeHoverStyle(e, 'Back')}
+              >
+                {loadingMore ? 'Loading…' : 'Load older versions'}
+              </button>
+            </div>
+          )}
         </div>
       </div>
 
@@ -715,6 +839,10 @@ const NewsletterVersionsPage = () => {
           from { transform: scale(0.9); opacity: 0; }
           to { transform: scale(1); opacity: 1; }
         }
+        @keyframes pulse {
+          0%, 100% { opacity: 1; }
+          50% { opacity: 0.5; }
+        }
         @keyframes slideInFromBottom {
           from { transform: translateX(-50%) translateY(50px); opacity: 0; }
           to { transform: translateX(-50%) translateY(-10px); opacity: 1; }